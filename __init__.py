@@ -3,9 +3,9 @@ Miro Engine Package
 Модульная система для создания диаграмм в Miro
 """
 
-from .miro_api import MiroAPI
-from .instruction_parser import InstructionParser
-from .command_executor import CommandExecutor
+from ._helper.miro_api import MiroAPI
+from ._helper.instruction_parser import InstructionParser
+from ._helper.command_executor import CommandExecutor
 
 __version__ = "1.0.0"
 __all__ = ["MiroAPI", "InstructionParser", "CommandExecutor"]
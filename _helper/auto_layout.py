@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auto Layout - расстановка фигур с координатами auto до отправки в API
+"""
+
+import math
+from collections import deque
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .instructions import Instruction, Layout, Shape
+
+AUTO = "auto"
+LAYOUTS = ("layered", "grid")
+
+# Раскладка для auto фигур до первой команды LAYOUT
+DEFAULT_LAYOUT = Layout("layered")
+
+def apply_layout(instructions: Iterable[Instruction]) -> Iterator[Instruction]:
+    """Отдает инструкции, подставляя координаты фигурам с x/y = auto
+
+    До первой auto фигуры инструкции идут потоком. Начиная с нее план
+    дочитывается до конца: для слоев нужен весь граф LINK.
+    """
+    instructions = iter(instructions)
+    layout = DEFAULT_LAYOUT
+    for instruction in instructions:
+        if instruction.type == "LAYOUT":
+            layout = instruction
+        elif instruction.type == "SHAPE" and _is_auto(instruction):
+            yield from _place(chain([instruction], instructions), layout)
+            return
+        yield instruction
+
+def _is_auto(shape: Shape) -> bool:
+    return shape.x is None or shape.y is None
+
+def _place(instructions: Iterable[Instruction], layout: Layout) -> List[Instruction]:
+    """Собирает план и расставляет auto фигуры по группам LAYOUT"""
+    plan: List[Instruction] = []
+    groups: List[Tuple[Layout, List[int]]] = []   # раскладка -> позиции фигур в plan
+    edges: List[Tuple[str, str]] = []
+
+    for instruction in instructions:
+        cmd_type = instruction.type
+        if cmd_type == "LAYOUT":
+            layout = instruction
+        elif cmd_type == "SHAPE" and _is_auto(instruction):
+            if not groups or groups[-1][0] is not layout:
+                groups.append((layout, []))
+            groups[-1][1].append(len(plan))
+        elif cmd_type == "LINK":
+            edges.append((instruction.start, instruction.end))
+        plan.append(instruction)
+
+    for group_layout, indices in groups:
+        shapes = [plan[i] for i in indices]
+        if group_layout.mode == "grid":
+            positions = _grid(shapes, group_layout)
+        else:
+            positions = _layered(shapes, edges, group_layout)
+        for i, shape, (x, y) in zip(indices, shapes, positions):
+            plan[i] = shape._replace(x=x if shape.x is None else shape.x,
+                                     y=y if shape.y is None else shape.y)
+    return plan
+
+def _cell(shapes: List[Shape], layout: Layout) -> Tuple[float, float]:
+    """Шаг сетки: самая крупная фигура группы плюс отступы"""
+    return (max(shape.width for shape in shapes) + layout.gap_x,
+            max(shape.height for shape in shapes) + layout.gap_y)
+
+def _grid(shapes: List[Shape], layout: Layout) -> List[Tuple[float, float]]:
+    """Квадратная сетка в порядке файла, от (x, y) вправо и вниз"""
+    step_x, step_y = _cell(shapes, layout)
+    columns = math.ceil(math.sqrt(len(shapes)))
+    return [(layout.x + (i % columns) * step_x, layout.y + (i // columns) * step_y)
+            for i in range(len(shapes))]
+
+def _layered(shapes: List[Shape], edges: List[Tuple[str, str]],
+             layout: Layout) -> List[Tuple[float, float]]:
+    """Слои по графу LINK сверху вниз, слои центрированы относительно x
+
+    Слой - самый длинный путь от истоков (циклы разрываются по порядку
+    файла), порядок внутри слоя - по среднему положению предков.
+    """
+    count = len(shapes)
+    index: Dict[str, int] = {shape.name: i for i, shape in enumerate(shapes)}
+    successors: List[List[int]] = [[] for _ in range(count)]
+    predecessors: List[List[int]] = [[] for _ in range(count)]
+    indegree = [0] * count
+    for start, end in edges:
+        i, j = index.get(start), index.get(end)
+        if i is None or j is None or i == j:
+            continue
+        successors[i].append(j)
+        predecessors[j].append(i)
+        indegree[j] += 1
+
+    # Топологический обход (Kahn) с самым длинным путем
+    layer = [0] * count
+    done = [False] * count
+    order: List[int] = []
+    queue = deque(i for i in range(count) if not indegree[i])
+    next_free = 0
+    while len(order) < count:
+        if not queue:
+            # Цикл: начинаем с самой ранней еще не расставленной фигуры
+            while done[next_free]:
+                next_free += 1
+            queue.append(next_free)
+        i = queue.popleft()
+        if done[i]:
+            continue
+        done[i] = True
+        order.append(i)
+        for j in successors[i]:
+            if done[j]:
+                continue  # обратное ребро цикла
+            if layer[i] + 1 > layer[j]:
+                layer[j] = layer[i] + 1
+            indegree[j] -= 1
+            if not indegree[j]:
+                queue.append(j)
+
+    layers: List[List[int]] = [[] for _ in range(max(layer) + 1)]
+    for i in order:
+        layers[layer[i]].append(i)
+
+    # Порядок в слое по барицентру предков - меньше пересечений связей
+    position: List[float] = [0.0] * count
+    for row in layers:
+        keys = {}
+        for slot, i in enumerate(row):
+            above = [position[p] for p in predecessors[i] if layer[p] < layer[i]]
+            keys[i] = sum(above) / len(above) if above else slot
+        row.sort(key=keys.__getitem__)
+        for slot, i in enumerate(row):
+            position[i] = slot
+
+    step_x, step_y = _cell(shapes, layout)
+    coordinates: List[Optional[Tuple[float, float]]] = [None] * count
+    for depth, row in enumerate(layers):
+        offset = (len(row) - 1) / 2
+        y = layout.y + depth * step_y
+        for slot, i in enumerate(row):
+            coordinates[i] = (layout.x + (slot - offset) * step_x, y)
+    return coordinates
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Board Reset - параллельное удаление элементов доски
+"""
+
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import event_log
+from .pipeline import prefetch
+from .board_snapshot import SNAPSHOT_TYPES
+
+# Элемент для удаления: (эндпоинт, id); связи удаляются через connectors
+Target = Tuple[str, str]
+
+# Типы, которые можно очистить на доске (связь - отдельный эндпоинт)
+RESET_TYPES = SNAPSHOT_TYPES + ("connector",)
+
+# Тип команды или элемента -> эндпоинт удаления
+DELETE_ENDPOINTS = {"LINK": "connectors", "connector": "connectors"}
+
+def target(item_type: str, item_id: str) -> Target:
+    """Эндпоинт удаления по типу команды журнала или элемента доски"""
+    return DELETE_ENDPOINTS.get(item_type, "items"), item_id
+
+def parse_types(mode: str) -> Optional[List[str]]:
+    """created -> None (созданное движком), all -> все типы; [] - ошибка"""
+    mode = mode.strip().lower()
+    if mode == "created":
+        return None
+    if mode == "all":
+        return list(RESET_TYPES)
+    types = [t.strip() for t in mode.split(",") if t.strip()]
+    unknown = [t for t in types if t not in RESET_TYPES]
+    if unknown or not types:
+        print(f"❌ Неизвестные типы: {', '.join(unknown) or mode}. "
+              f"Доступны: {', '.join(RESET_TYPES)}")
+        return []
+    return types
+
+def board_targets(api, types: Sequence[str] = RESET_TYPES) -> Iterator[Target]:
+    """Элементы выбранных типов с доски, страница за страницей"""
+    for item_type in types:
+        if item_type == "connector":
+            pages = api.iter_pages("connectors")
+        else:
+            pages = api.iter_pages("items", {"type": item_type})
+        for page in prefetch(pages, maxsize=1):
+            for item in page:
+                if item.get("id"):
+                    yield target(item_type, str(item["id"]))
+
+class BulkDeleter:
+    """Удаляет элементы пулом потоков через общий планировщик запросов
+
+    В полете не больше window запросов, поэтому источник (например,
+    постраничное чтение доски) читается по мере удаления. Прогресс
+    выводится строкой статуса event_log.
+    """
+
+    def __init__(self, api, workers: int, window: Optional[int] = None,
+                 interval: float = 0.5):
+        self.api = api
+        self.workers = max(1, workers)
+        self.window = window or self.workers * 4
+        self.interval = interval
+        self.deleted: List[str] = []
+        self.failed: List[str] = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._total: Optional[int] = None
+
+    def run(self, targets: Iterable[Target], total: Optional[int] = None) -> int:
+        """Удаляет элементы, возвращает число удаленных за этот вызов"""
+        before = len(self.deleted)
+        first = not self._started
+        self._started = self._started or time.monotonic()
+        self._total = total
+        submitted = 0
+        pending = set()
+        with event_log.progress(self._line, self.interval), \
+             ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for endpoint, item_id in targets:
+                if len(pending) >= self.window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(pool.submit(self._delete, endpoint, item_id))
+                submitted += 1
+            wait(pending)
+        if submitted or first:
+            event_log.echo(self._line())
+        return len(self.deleted) - before
+
+    def _delete(self, endpoint: str, item_id: str):
+        ok = self.api.delete_item(item_id, endpoint)
+        with self._lock:
+            (self.deleted if ok else self.failed).append(item_id)
+
+    def _line(self) -> str:
+        done = len(self.deleted)
+        rate = done / max(time.monotonic() - self._started, 1e-6)
+        line = f"  🗑  Удалено: {done}" + (f"/{self._total}" if self._total else "")
+        if self.failed:
+            line += f", ошибок: {len(self.failed)}"
+        return f"{line} ({rate:.0f}/сек)"
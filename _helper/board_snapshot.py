@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Board Snapshot - индекс элементов, уже лежащих на доске
+"""
+
+import re
+import html
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .pipeline import prefetch
+
+# Типы элементов, которые читаются из GET /items (связи - из /connectors)
+SNAPSHOT_TYPES = ("frame", "shape", "sticky_note", "text")
+
+# Эндпоинт создания -> тип элемента в ответах API
+ENDPOINT_TYPES = {
+    "frames": "frame",
+    "shapes": "shape",
+    "sticky_notes": "sticky_note",
+    "texts": "text",
+    "connectors": "connector",
+}
+
+HTML_TAG = re.compile(r"<[^>]+>")
+
+def item_key(item_type: str, item: dict) -> Optional[Tuple]:
+    """Ключ элемента: тип, текст, позиция и рамка (связь - по концам)
+
+    Строится одинаково из ответа API и из тела запроса на создание, поэтому
+    запланированный элемент находится среди уже существующих.
+    """
+    if item_type == "connector":
+        start = (item.get("startItem") or {}).get("id")
+        end = (item.get("endItem") or {}).get("id")
+        return (item_type, start, end) if start and end else None
+
+    data = item.get("data") or {}
+    text = data.get("content") or data.get("title") or ""
+    if "<" in text or "&" in text:
+        text = html.unescape(HTML_TAG.sub("", text))
+    position = item.get("position") or {}
+    parent = (item.get("parent") or {}).get("id")
+    return (item_type, "".join(text.split()),
+            round(float(position.get("x", 0))), round(float(position.get("y", 0))), parent)
+
+class BoardSnapshot:
+    """Снимок доски: ключ элемента -> id (одинаковых элементов может быть несколько)"""
+
+    def __init__(self):
+        self.index: Dict[Tuple, List[str]] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_page(self, items: Iterable[dict], item_type: Optional[str] = None):
+        """Добавляет страницу ответа API"""
+        keyed = []
+        for item in items:
+            kind = item_type or item.get("type", "")
+            keyed.append((kind, item_key(kind, item), item.get("id")))
+        with self._lock:
+            for kind, key, item_id in keyed:
+                self.counts[kind] = self.counts.get(kind, 0) + 1
+                if key is not None and item_id:
+                    self.index.setdefault(key, []).append(str(item_id))
+
+    def take(self, item_type: str, payload: dict) -> Optional[str]:
+        """Id существующего элемента для тела запроса; каждый id выдается один раз"""
+        key = item_key(item_type, payload)
+        with self._lock:
+            ids = self.index.get(key)
+            if not ids:
+                return None
+            item_id = ids.pop()
+            if not ids:
+                del self.index[key]
+            return item_id
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+def load_snapshot(api, types: Iterable[str] = SNAPSHOT_TYPES,
+                  connectors: bool = True) -> BoardSnapshot:
+    """Читает доску постранично: каждый тип - своим потоком
+
+    Следующая страница запрашивается, пока разбирается текущая, поэтому в
+    памяти держится не больше пары страниц на поток.
+    """
+    snapshot = BoardSnapshot()
+    streams = [("items", {"type": item_type}, None) for item_type in types]
+    if connectors:
+        streams.append(("connectors", {}, "connector"))
+
+    def consume(path: str, params: Dict[str, str], item_type: Optional[str]):
+        for page in prefetch(api.iter_pages(path, params), maxsize=1):
+            snapshot.add_page(page, item_type)
+
+    with ThreadPoolExecutor(max_workers=len(streams)) as pool:
+        for future in [pool.submit(consume, *stream) for stream in streams]:
+            future.result()
+    return snapshot
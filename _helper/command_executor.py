@@ -5,14 +5,50 @@ Command Executor - выполнение распарсенных команд
 """
 
 import time
-from typing import Dict, Any
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from . import event_log
 from .miro_api import MiroAPI
+from .run_journal import RunJournal
+from .board_snapshot import ENDPOINT_TYPES, BoardSnapshot
+from .instructions import Instruction, element_name
+
+class ItemHandler(NamedTuple):
+    """Обработчик команды, создающей элемент на доске"""
+    stat: str                                   # ключ в статистике
+    create: Callable[[MiroAPI, Any], Optional[str]]
+    payload: Callable[[MiroAPI, Any], Optional[Tuple[str, dict]]]  # для обновления
+    describe: Callable[[Any], str]              # подпись в логе
+
+# Таблицы команд: тип -> обработчик
+ITEMS: Dict[str, ItemHandler] = {}
+ACTIONS: Dict[str, Callable[["CommandExecutor", Any], bool]] = {}
+
+# Команды, которые можно создавать пакетами (MiroAPI.bulk_create)
+BULK_COMMANDS = ("SHAPE", "STICKY", "TEXT")
+
+def register_item(cmd_type: str, stat: str, create: Callable, payload: Callable,
+                  describe: Callable):
+    """Регистрирует команду, создающую элемент"""
+    ITEMS[cmd_type] = ItemHandler(stat, create, payload, describe)
+
+def register_action(cmd_type: str):
+    """Регистрирует служебную команду: func(executor, command) -> bool"""
+    def decorator(func: Callable) -> Callable:
+        ACTIONS[cmd_type] = func
+        return func
+    return decorator
 
 class CommandExecutor:
     """Исполнитель команд"""
     
-    def __init__(self, api_client: MiroAPI):
+    def __init__(self, api_client: MiroAPI, journal: Optional[RunJournal] = None,
+                 snapshot: Optional[BoardSnapshot] = None, bundle=None):
         self.api = api_client
+        self.journal = journal
+        self.snapshot = snapshot  # элементы, уже лежащие на доске
+        self.bundle = bundle      # скомпилированные тела запросов (plan_compiler.Bundle)
+        self.existing = 0
         self.stats = {
             "frames": 0,
             "shapes": 0,
@@ -20,95 +56,184 @@ class CommandExecutor:
             "connectors": 0,
             "texts": 0
         }
+        self._lock = threading.Lock()
     
-    def execute(self, command: Dict[str, Any]) -> bool:
+    def execute(self, command: Instruction) -> bool:
         """Выполняет одну команду"""
         
-        cmd_type = command.get("type")
+        cmd_type = command.type
         
         try:
-            if cmd_type == "FRAME":
-                result = self.api.create_frame(
-                    command["title"],
-                    command["x"],
-                    command["y"],
-                    command["width"],
-                    command["height"]
-                )
-                if result:
-                    self.stats["frames"] += 1
-                    print(f"  ✓ Рамка '{command['title']}'")
-                return bool(result)
-            
-            elif cmd_type == "SHAPE":
-                result = self.api.create_shape(
-                    command["name"],
-                    command["x"],
-                    command["y"],
-                    command["width"],
-                    command["height"],
-                    command["color"],
-                    command["shape"]
-                )
-                if result:
-                    self.stats["shapes"] += 1
-                    print(f"  ✓ Фигура '{command['name']}'")
-                return bool(result)
-            
-            elif cmd_type == "STICKY":
-                result = self.api.create_sticky(
-                    command["text"],
-                    command["x"],
-                    command["y"],
-                    command["color"]
-                )
-                if result:
-                    self.stats["stickies"] += 1
-                    print(f"  ✓ Стикер")
-                return bool(result)
-            
-            elif cmd_type == "TEXT":
-                result = self.api.create_text(
-                    command["content"],
-                    command["x"],
-                    command["y"],
-                    command["size"]
-                )
-                if result:
-                    self.stats["texts"] += 1
-                    print(f"  ✓ Текст")
-                return bool(result)
-            
-            elif cmd_type == "LINK":
-                result = self.api.create_connector(
-                    command["start"],
-                    command["end"],
-                    command["label"]
-                )
-                if result:
-                    self.stats["connectors"] += 1
-                    print(f"  ✓ Связь '{command['start']}' -> '{command['end']}'")
-                return bool(result)
-            
-            elif cmd_type == "SLEEP":
-                time.sleep(command["seconds"])
-                return True
-            
-            elif cmd_type == "PRINT":
-                print(command["message"])
-                return True
+            if cmd_type in ITEMS:
+                return bool(self.create(command))
             
-            elif cmd_type == "SET":
-                # Переменные уже обработаны в парсере
-                return True
-            
-            else:
-                print(f"⚠️  Неизвестная команда: {cmd_type}")
+            action = ACTIONS.get(cmd_type)
+            if action is None:
+                event_log.warning(f"⚠️  Неизвестная команда: {cmd_type}", event="unknown_command",
+                                  type=cmd_type, file=command.file, line=command.line)
                 return False
+            return action(self, command)
                 
         except Exception as e:
-            print(f"❌ Ошибка выполнения: {e}")
+            self._failed(command, e)
+            return False
+    
+    def _failed(self, command: Instruction, error: Exception):
+        """Учитывает команду, упавшую с исключением, как неудачную"""
+        event_log.error(f"❌ Ошибка выполнения: {error}", event="failed", type=command.type,
+                        file=command.file, line=command.line)
+        self.api.metrics.item(command.type, False)
+        if self.journal:
+            self.journal.mark_failed()
+    
+    def create(self, command: Instruction) -> Optional[str]:
+        """Создает элемент по команде, возвращает его id в Miro"""
+        handler = ITEMS.get(command.type)
+        if handler is None:
+            return None
+        
+        result = self._existing(handler, command)
+        if result:
+            return result
+        item = self.bundle.get(self.api, command) if self.bundle is not None else None
+        if item is not None:
+            result = self._send(command, item)
+        else:
+            result = handler.create(self.api, command)
+        self._created(handler, command, result)
+        return result
+    
+    def _send(self, command: Instruction, item) -> Optional[str]:
+        """Создает элемент по скомпилированному телу запроса"""
+        body = self.bundle.body(item, self.api.elements)
+        if body is None:
+            event_log.warning(f"  ⚠️  Не могу связать '{command.start}' -> '{command.end}'",
+                              event="unlinked", file=command.file, line=command.line)
+            return None
+        result = self.api.api_call(item.endpoint, body)
+        name = element_name(command)
+        if result and name:
+            self.api.elements[name] = result  # Для связей и элементов в рамке
+        return result
+    
+    def create_batch(self, commands: List[Instruction]) -> int:
+        """Создает команды из BULK_COMMANDS одним запросом, возвращает число созданных
+        
+        Id из ответа сопоставляются командам по позиции. Если пакет не
+        прошел, команды создаются по одной. Исключения (реестр, журнал)
+        учитываются как ошибки своих команд, как в execute().
+        """
+        existing = 0
+        if self.snapshot is not None:
+            pending = []
+            for command in commands:
+                try:
+                    if self._existing(ITEMS[command.type], command):
+                        existing += 1
+                        continue
+                except Exception as e:
+                    self._failed(command, e)
+                    continue
+                pending.append(command)
+            commands = pending
+            if not commands:
+                return existing
+        
+        items = ([self.bundle.get(self.api, command) for command in commands]
+                 if self.bundle is not None else [None])
+        try:
+            if None in items:
+                ids = self.api.bulk_create([ITEMS[command.type].payload(self.api, command)
+                                            for command in commands])
+            else:
+                ids = self.api.bulk_send(self.bundle.bulk_body(items, self.api.elements),
+                                         len(items))
+        except Exception as e:
+            event_log.error(f"❌ Ошибка выполнения: {e}", event="failed", type="bulk",
+                            count=len(commands))
+            ids = None
+        if ids is None:
+            return existing + sum(1 for command in commands if self.execute(command))
+        
+        created = 0
+        for command, item_id in zip(commands, ids):
+            try:
+                if command.type == "SHAPE":
+                    self.api.elements[command.name] = item_id  # Сохраняем для связей
+                self._created(ITEMS[command.type], command, item_id)
+            except Exception as e:
+                self._failed(command, e)
+                continue
+            created += 1
+        return existing + created
+    
+    def _existing(self, handler: ItemHandler, command: Instruction) -> Optional[str]:
+        """Id такого же элемента из снимка доски, если он там есть"""
+        if self.snapshot is None:
+            return None
+        request = handler.payload(self.api, command)
+        if request is None:
+            return None
+        endpoint, data = request
+        item_id = self.snapshot.take(ENDPOINT_TYPES[endpoint], data)
+        if not item_id:
+            return None
+        name = element_name(command)
+        if name:
+            self.api.elements[name] = item_id
+        with self._lock:
+            self.existing += 1
+        if event_log.verbose():
+            event_log.debug(f"  = Уже на доске: {handler.describe(command)}", event="existing",
+                            type=command.type, id=item_id, file=command.file, line=command.line)
+        self._record(command, item_id)
+        return item_id
+    
+    def _created(self, handler: ItemHandler, command: Instruction, result: Optional[str]):
+        """Учитывает результат создания в метриках, статистике и журнале"""
+        self.api.metrics.item(command.type, bool(result))
+        if result:
+            self._count(handler.stat)
+            if event_log.verbose():
+                event_log.debug(f"  ✓ {handler.describe(command)}", event="created",
+                                type=command.type, id=result, file=command.file,
+                                line=command.line)
+        self._record(command, result)
+    
+    def update(self, command: Instruction, item_id: str) -> bool:
+        """Обновляет ранее созданный элемент по измененной команде"""
+        handler = ITEMS.get(command.type)
+        request = handler.payload(self.api, command) if handler else None
+        if request is None:
             return False
+        
+        endpoint, data = request
+        result = self.api.update_item(endpoint, item_id, data)
+        if result:
+            event_log.debug(f"  ✎ Обновлено: {command.type} {item_id}", event="updated",
+                            type=command.type, id=item_id, file=command.file, line=command.line)
+        return result
+    
+    def _record(self, command: Instruction, result: Optional[str]):
+        """Отмечает результат команды в журнале запуска"""
+        if not self.journal:
+            return
+        if result:
+            self.journal.record(command, result)
+        else:
+            self.journal.mark_failed()
+    
+    def _count(self, item_type: str):
+        """Потокобезопасно увеличивает счетчик"""
+        with self._lock:
+            self.stats[item_type] = self.stats.get(item_type, 0) + 1
+    
+    def add_stats(self, stats: Dict[str, int], existing: int = 0):
+        """Добавляет статистику другого исполнителя"""
+        with self._lock:
+            for item_type, count in stats.items():
+                self.stats[item_type] = self.stats.get(item_type, 0) + count
+            self.existing += existing
     
     def get_stats(self) -> Dict[str, int]:
         """Возвращает статистику"""
@@ -123,4 +248,77 @@ class CommandExecutor:
             if count > 0:
                 print(f"  • {item_type}: {count}")
         print(f"  • ВСЕГО: {sum(self.stats.values())}")
+        if self.existing:
+            print(f"  • Уже были на доске: {self.existing}")
+        pool = self.api.get_pool_stats()
+        if pool["requests"]:
+            print(f"  • Соединения: {pool['connections']} открыто, "
+                  f"{pool['reused']}/{pool['requests']} запросов переиспользовали")
+        self.api.metrics.print_summary()
         print("="*50)
+
+def _connector_payload(api: MiroAPI, command) -> Optional[Tuple[str, dict]]:
+    """Тело обновления связи с текущими id концов"""
+    start_id = api.elements.get(command.start)
+    end_id = api.elements.get(command.end)
+    if not start_id or not end_id:
+        return None
+    return "connectors", api.connector_payload(start_id, end_id, command.label)
+
+register_item(
+    "FRAME", "frames",
+    create=lambda api, c: api.create_frame(c.title, c.x, c.y, c.width, c.height),
+    payload=lambda api, c: ("frames", api.frame_payload(c.title, c.x, c.y, c.width, c.height)),
+    describe=lambda c: f"Рамка '{c.title}'"
+)
+
+register_item(
+    "SHAPE", "shapes",
+    create=lambda api, c: api.create_shape(c.name, c.x, c.y, c.width, c.height,
+                                           c.color, c.shape, c.parent),
+    payload=lambda api, c: ("shapes", api.shape_payload(c.name, c.x, c.y, c.width, c.height,
+                                                        c.color, c.shape, c.parent)),
+    describe=lambda c: f"Фигура '{c.name}'"
+)
+
+register_item(
+    "STICKY", "stickies",
+    create=lambda api, c: api.create_sticky(c.text, c.x, c.y, c.color, c.parent),
+    payload=lambda api, c: ("sticky_notes", api.sticky_payload(c.text, c.x, c.y, c.color,
+                                                               c.parent)),
+    describe=lambda c: "Стикер"
+)
+
+register_item(
+    "TEXT", "texts",
+    create=lambda api, c: api.create_text(c.content, c.x, c.y, c.size, c.parent),
+    payload=lambda api, c: ("texts", api.text_payload(c.content, c.x, c.y, c.size, c.parent)),
+    describe=lambda c: "Текст"
+)
+
+register_item(
+    "LINK", "connectors",
+    create=lambda api, c: api.create_connector(c.start, c.end, c.label),
+    payload=_connector_payload,
+    describe=lambda c: f"Связь '{c.start}' -> '{c.end}'"
+)
+
+@register_action("SLEEP")
+def _sleep(executor: CommandExecutor, command) -> bool:
+    time.sleep(command.seconds)
+    return True
+
+@register_action("PRINT")
+def _print(executor: CommandExecutor, command) -> bool:
+    event_log.echo(command.message)
+    return True
+
+@register_action("SET")
+def _set(executor: CommandExecutor, command) -> bool:
+    # Переменные уже обработаны в парсере
+    return True
+
+@register_action("LAYOUT")
+def _layout(executor: CommandExecutor, command) -> bool:
+    # Координаты уже расставлены в auto_layout
+    return True
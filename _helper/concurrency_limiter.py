@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrency Limiter - адаптивный предел одновременных запросов (AIMD)
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional
+
+# Сглаживание текущей задержки и дрейф базовой вверх на каждый ответ
+SMOOTHING = 0.2
+BASELINE_DRIFT = 0.0002
+
+class ConcurrencyLimiter:
+    """Предел запросов в полете: аддитивный рост, мультипликативный спад
+
+    Пока ответы приходят без ошибок и без роста задержки, предел растет
+    примерно на 1 за круг (+1/limit на каждый ответ), но только если он
+    был выбран полностью. После 429, 5xx, сетевой ошибки или задержки выше
+    базовой в tolerance раз предел умножается на backoff - не чаще раза
+    за круг: ответы на запросы, ушедшие до снижения, его уже не снижают.
+
+    Текущая задержка - скользящее среднее, базовая - его минимум с
+    медленным дрейфом вверх (сеть может стать медленнее навсегда). Обе
+    считаются по каждому эндпоинту (пакетный запрос дольше одиночного).
+    """
+
+    def __init__(self, start: int, maximum: int, minimum: int = 1,
+                 backoff: float = 0.5, tolerance: float = 2.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self._limit = float(min(self.maximum, max(self.minimum, start)))
+        self._decreased_at = 0.0
+        self._latency: Dict[str, List[float]] = {}  # эндпоинт -> [базовая, сглаженная]
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> float:
+        """Ждет свободного места, возвращает момент отправки для release"""
+        with self._condition:
+            while self.in_flight >= int(self._limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, endpoint: str, seconds: Optional[float],
+                overloaded: bool = False):
+        """Учитывает ответ: seconds - задержка (None - ответа нет)"""
+        with self._condition:
+            saturated = self.in_flight >= int(self._limit)
+            self.in_flight -= 1
+            inflated = seconds is not None and self._inflated(endpoint, seconds)
+            if overloaded or inflated:
+                if started >= self._decreased_at:
+                    self._limit = max(self.minimum, self._limit * self.backoff)
+                    self._decreased_at = time.monotonic()
+            elif saturated and seconds is not None:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            self._condition.notify(max(1, int(self._limit) - self.in_flight))
+
+    def _inflated(self, endpoint: str, seconds: float) -> bool:
+        """Текущая задержка выше базовой в tolerance раз"""
+        stats = self._latency.get(endpoint)
+        if stats is None:
+            self._latency[endpoint] = [seconds, seconds]
+            return False
+        stats[1] += (seconds - stats[1]) * SMOOTHING
+        stats[0] = min(stats[0] * (1 + BASELINE_DRIFT), stats[1])
+        return stats[1] > stats[0] * self.tolerance
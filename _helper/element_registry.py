@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Element Registry - постоянный реестр именованных элементов Miro
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class ElementRegistry:
+    """Реестр {имя: id} для одной доски, хранящийся в SQLite
+
+    Заменяет словарь MiroAPI.elements: имена переживают перезапуск и
+    смену движка, поэтому LINK может ссылаться на фигуры прошлых сессий.
+    Чтение идет через кеш в памяти и индекс (board_id, name), запись
+    копится в буфере и сбрасывается пакетами.
+    """
+
+    def __init__(self, path: Path, board_id: str, batch_size: int = 500):
+        self.path = Path(path)
+        self.board_id = board_id
+        self.batch_size = batch_size
+        self._cache: Dict[str, str] = {}
+        self._pending: List[Tuple[str, str, str]] = []
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS elements ("
+            " board_id TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " item_id TEXT NOT NULL,"
+            " PRIMARY KEY (board_id, name)"
+            ") WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Возвращает id элемента по имени"""
+        with self._lock:
+            item_id = self._cache.get(name)
+            if item_id is None:
+                row = self._db.execute(
+                    "SELECT item_id FROM elements WHERE board_id = ? AND name = ?",
+                    (self.board_id, name)
+                ).fetchone()
+                if row is None:
+                    return default
+                item_id = self._cache[name] = row[0]
+            return item_id
+
+    def __getitem__(self, name: str) -> str:
+        item_id = self.get(name)
+        if item_id is None:
+            raise KeyError(name)
+        return item_id
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __setitem__(self, name: str, item_id: str):
+        with self._lock:
+            self._cache[name] = item_id
+            self._pending.append((self.board_id, name, item_id))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def pop(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Удаляет имя из реестра"""
+        item_id = self.get(name, default)
+        with self._lock:
+            self._flush_locked()
+            self._cache.pop(name, None)
+            self._db.execute("DELETE FROM elements WHERE board_id = ? AND name = ?",
+                             (self.board_id, name))
+            self._db.commit()
+        return item_id
+
+    def item_ids(self) -> List[str]:
+        """Id всех элементов доски в реестре"""
+        self.flush()
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT item_id FROM elements WHERE board_id = ?", (self.board_id,))]
+
+    def discard_ids(self, item_ids: Iterable[str]):
+        """Удаляет из реестра имена элементов, удаленных с доски"""
+        item_ids = set(item_ids)
+        with self._lock:
+            self._flush_locked()
+            names = [name for name, item_id in self._db.execute(
+                "SELECT name, item_id FROM elements WHERE board_id = ?", (self.board_id,))
+                if item_id in item_ids]
+            self._db.executemany("DELETE FROM elements WHERE board_id = ? AND name = ?",
+                                 [(self.board_id, name) for name in names])
+            self._db.commit()
+            for name in names:
+                self._cache.pop(name, None)
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM elements WHERE board_id = ?", (self.board_id,)
+            ).fetchone()[0]
+
+    def flush(self):
+        """Записывает накопленные изменения на диск"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Пакетная запись буфера (вызывается под блокировкой)"""
+        if not self._pending:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO elements (board_id, name, item_id) VALUES (?, ?, ?)",
+            self._pending
+        )
+        self._db.commit()
+        self._pending.clear()
+
+    def close(self):
+        """Сбрасывает буфер и закрывает базу"""
+        self.flush()
+        with self._lock:
+            self._db.close()
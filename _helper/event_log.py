@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Event Log - уровни вывода, асинхронная запись и строка прогресса
+"""
+
+import sys
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Iterator, Optional
+
+from . import settings
+
+log = logging.getLogger("miro")
+
+# Уровни MIRO_LOG_LEVEL; verbose - то же, что debug (каждый элемент)
+LEVELS = {
+    "debug": logging.DEBUG,
+    "verbose": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+class Console:
+    """Терминал с одной обновляемой строкой статуса
+
+    Обычные строки печатаются над статусом: строка статуса стирается,
+    выводится текст, статус рисуется заново.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = ""
+
+    def write(self, text: str):
+        with self._lock:
+            stream = sys.stdout
+            if self._status:
+                stream.write("\r\033[K")
+            stream.write(text + "\n")
+            if self._status:
+                stream.write(self._status)
+            stream.flush()
+
+    def status(self, text: str):
+        width = shutil.get_terminal_size().columns - 1
+        with self._lock:
+            self._status = text[:width]
+            sys.stdout.write("\r\033[K" + self._status)
+            sys.stdout.flush()
+
+    def clear(self):
+        with self._lock:
+            if self._status:
+                sys.stdout.write("\r\033[K")
+                sys.stdout.flush()
+                self._status = ""
+
+console = Console()
+
+class ConsoleHandler(logging.Handler):
+    """Записи лога в консоль поверх строки прогресса"""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            console.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+class JsonLinesFormatter(logging.Formatter):
+    """Запись лога одной JSON строкой: время, уровень, текст и поля события"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {"ts": round(record.created, 6), "level": record.levelname.lower(),
+                "thread": record.threadName, "msg": record.getMessage().strip()}
+        fields = getattr(record, "fields", None)
+        if fields:
+            data.update(fields)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class JsonLinesHandler(logging.FileHandler):
+    """JSON lines файл с буферизованной записью (сбрасывается при flush/закрытии)"""
+
+    def __init__(self, path: str):
+        super().__init__(path, mode="a", encoding="utf-8")
+        self.setFormatter(JsonLinesFormatter())
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+_queue: "queue.Queue" = queue.Queue()
+_listener: Optional[QueueListener] = None
+
+def setup(level: Optional[str] = None, json_path: Optional[str] = None):
+    """Настраивает лог: консоль с порогом level и JSON lines файл
+
+    Записи складываются в очередь и пишутся отдельным потоком, поэтому
+    рабочие потоки не ждут терминал. Повторный вызов без параметров
+    ничего не меняет.
+    """
+    global _listener
+    if _listener is not None:
+        if level is None and json_path is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+
+    level = level or settings.LOG_LEVEL
+    json_path = settings.LOG_JSON if json_path is None else json_path
+    console_level = LEVELS.get(level.strip().lower(), logging.INFO)
+    handlers = [ConsoleHandler(console_level)]
+    if json_path:
+        handlers.append(JsonLinesHandler(json_path))  # все уровни
+
+    log.handlers = [QueueHandler(_queue)]
+    log.setLevel(logging.DEBUG if json_path else console_level)
+    log.propagate = False
+    _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+def flush():
+    """Дожидается записи всех событий из очереди"""
+    if _listener is None:
+        return
+    _queue.join()
+    for handler in _listener.handlers:
+        handler.flush()
+
+def _stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    console.clear()
+
+atexit.register(_stop)
+
+def verbose() -> bool:
+    """Включен ли вывод по каждому элементу (проверка перед сборкой строки)"""
+    return log.isEnabledFor(logging.DEBUG)
+
+def _event(level: int, message: str, fields: dict):
+    if log.isEnabledFor(level):
+        log.log(level, message, extra={"fields": fields} if fields else None)
+
+def debug(message: str, **fields):
+    _event(logging.DEBUG, message, fields)
+
+def info(message: str, **fields):
+    _event(logging.INFO, message, fields)
+
+def warning(message: str, **fields):
+    _event(logging.WARNING, message, fields)
+
+def error(message: str, **fields):
+    _event(logging.ERROR, message, fields)
+
+def echo(text: str):
+    """Строка в консоль поверх прогресса, минуя уровни (сводки, PRINT)"""
+    flush()
+    console.write(text)
+
+@contextmanager
+def progress(render: Callable[[], str], interval: float = 0.5) -> Iterator[None]:
+    """Обновляет строку статуса render() раз в interval секунд, пока идет блок
+
+    Включается MIRO_PROGRESS (по умолчанию - если вывод в терминал). На
+    выходе дожидается записи лога и стирает строку.
+    """
+    if not settings.PROGRESS:
+        try:
+            yield
+        finally:
+            flush()
+        return
+
+    stop = threading.Event()
+
+    def tick():
+        while not stop.wait(interval):
+            console.status(render())
+
+    ticker = threading.Thread(target=tick, name="progress", daemon=True)
+    ticker.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        ticker.join()
+        flush()
+        console.clear()
+
+def item_progress(metrics) -> Callable[[], str]:
+    """Строка прогресса создания элементов по счетчикам Metrics"""
+    started = time.monotonic()
+    base = metrics.totals()
+
+    def render() -> str:
+        totals = metrics.totals()
+        done = totals["success"] - base["success"]
+        rate = done / max(time.monotonic() - started, 1e-6)
+        line = f"  ⏳ Создано: {done} ({rate:.0f}/сек), в работе: {totals['in_flight']}"
+        if totals["concurrency_limit"]:
+            line += f" из {totals['concurrency_limit']}"
+        failed = totals["failure"] - base["failure"]
+        if failed:
+            line += f", ошибок: {failed}"
+        retries = totals["retries"] - base["retries"]
+        if retries:
+            line += f", повторов: {retries}"
+        return line
+
+    return render
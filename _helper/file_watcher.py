@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File Watcher - уведомления файловой системы об изменении инструкций
+"""
+
+import time
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+from . import event_log
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog нужен только для режима --watch
+    Observer = None
+    FileSystemEventHandler = object
+
+class FileWatcher(FileSystemEventHandler):
+    """Следит за каталогами и вызывает callback для измененных файлов
+
+    Серия событий по одному файлу (редакторы пишут его в несколько приемов)
+    схлопывается: callback вызывается, когда файл не менялся `debounce`
+    секунд. Вызовы идут последовательно из одного потока.
+    """
+
+    def __init__(self, directories: Iterable[Path], matches: Callable[[Path], bool],
+                 callback: Callable[[Path], None], debounce: float = 0.5):
+        if Observer is None:
+            raise RuntimeError("Для режима наблюдения установите watchdog: pip install watchdog")
+        self.directories = [Path(d) for d in directories]
+        self.matches = matches
+        self.callback = callback
+        self.debounce = debounce
+        self._due: Dict[Path, float] = {}
+        self._changed = threading.Condition()
+        self._stopped = False
+        self._observer = Observer()
+
+    def on_created(self, event):
+        self._schedule(event)
+
+    def on_modified(self, event):
+        self._schedule(event)
+
+    def on_moved(self, event):
+        # Атомарное сохранение: запись во временный файл и rename поверх
+        self._schedule(event, event.dest_path)
+
+    def _schedule(self, event, path: Optional[str] = None):
+        if event.is_directory:
+            return
+        file_path = Path(path or event.src_path).resolve()
+        if not self.matches(file_path):
+            return
+        with self._changed:
+            self._due[file_path] = time.monotonic() + self.debounce
+            self._changed.notify()
+
+    def _next_ready(self) -> Optional[Path]:
+        """Ждет файл, который успокоился дольше debounce"""
+        with self._changed:
+            while not self._stopped:
+                if not self._due:
+                    self._changed.wait()
+                    continue
+                path, due = min(self._due.items(), key=lambda item: item[1])
+                delay = due - time.monotonic()
+                if delay <= 0:
+                    del self._due[path]
+                    return path
+                self._changed.wait(delay)
+            return None
+
+    def run(self):
+        """Блокирует поток до stop() или Ctrl+C"""
+        for directory in self.directories:
+            self._observer.schedule(self, str(directory), recursive=False)
+        self._observer.start()
+        try:
+            while True:
+                path = self._next_ready()
+                if path is None:
+                    break
+                if not path.exists():
+                    continue
+                try:
+                    self.callback(path)
+                except Exception as e:
+                    event_log.error(f"❌ Ошибка обработки {path}: {e}", event="watch_error",
+                                    file=str(path))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._observer.stop()
+            self._observer.join()
+
+    def stop(self):
+        with self._changed:
+            self._stopped = True
+            self._changed.notify()
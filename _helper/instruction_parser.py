@@ -4,110 +4,107 @@
 Instruction Parser - парсер текстовых инструкций
 """
 
-from typing import List, Dict, Tuple, Optional
+import os
+import re
+import ast
+import math
+import operator
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import event_log
+from .parse_cache import ParseCache, default_cache
+from .instructions import (Instruction, Frame, Layout, Link, Print, SetVar, Shape,
+                           Sleep, Sticky, Text)
+from .auto_layout import AUTO, LAYOUTS, apply_layout
+
+# Ссылка на переменную: $ и самое длинное имя ($color не путается с $col)
+VARIABLE_REF = re.compile(r"\$(\w+)")
+
+# Таблица команд: имя -> (минимум частей, функция разбора)
+COMMANDS: Dict[str, Tuple[int, Callable]] = {}
+
+def register_command(name: str, min_parts: int):
+    """Регистрирует разбор команды: func(parser, parts, file, line) -> запись"""
+    def decorator(func: Callable) -> Callable:
+        COMMANDS[name] = (min_parts, func)
+        return func
+    return decorator
+
+# Арифметика в фигурных скобках после подстановки переменных: {$i*220+100}.
+# Вычисляется только в числовых полях; текст, имена и подписи не меняются
+EXPRESSION = re.compile(r"\{([-+*/%().\s]*\d[-+*/%().\d\s]*)\}")
+
+class Block(NamedTuple):
+    """Блочная конструкция: раскрывается в инструкции генератором"""
+    min_parts: int
+    has_body: bool      # тело до END
+    expand: Callable    # func(parser, parts, file, line, body) -> Iterator[Instruction]
+
+class Template(NamedTuple):
+    """TEMPLATE|имя|параметры...: тело подставляется командой INCLUDE"""
+    params: List[str]
+    body: List[Tuple[int, str]]
+    file: str
+
+# Таблица блоков: имя -> Block
+BLOCKS: Dict[str, Block] = {}
+
+def register_block(name: str, min_parts: int, has_body: bool = True):
+    """Регистрирует блок: func(parser, parts, file, line, body) -> инструкции"""
+    def decorator(func: Callable) -> Callable:
+        BLOCKS[name] = Block(min_parts, has_body, func)
+        return func
+    return decorator
 
 class InstructionParser:
     """Парсер инструкций из текстовых файлов"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ParseCache] = None):
         self.variables = {}  # Переменные для подстановки
+        self.cache = cache
+        self.errors: List[Tuple[str, int, str]] = []  # (файл, строка, ошибка) последнего файла
+        self.templates: Dict[str, Template] = {}      # TEMPLATE последнего файла
+        self.includes: List[str] = []                 # файлы, подключенные INCLUDE
+        self._including: List[str] = []               # стек INCLUDE для поиска циклов
         
-    def parse_line(self, line: str) -> Optional[Dict]:
-        """Парсит одну строку инструкции"""
+    def _substitute(self, match: "re.Match") -> str:
+        """Значение переменной; неизвестная ссылка остается как есть"""
+        value = self.variables.get(match.group(1))
+        return match.group(0) if value is None else str(value)
+    
+    def _prepare(self, line: str) -> Optional[str]:
+        """Строка после подстановок; None для пустых строк и комментариев"""
         
         # Очистка и пропуск пустых/комментариев
         line = line.strip()
         if not line or line.startswith('#'):
             return None
         
-        # Подстановка переменных
-        for var, value in self.variables.items():
-            line = line.replace(f"${var}", str(value))
+        # Подстановка переменных за один проход по строке
+        if '$' in line and self.variables:
+            line = VARIABLE_REF.sub(self._substitute, line)
         
         # Замена спецсимволов
-        line = line.replace('\\n', '\n')
-        
-        # Разбор на части
-        parts = line.split('|')
-        if len(parts) < 1:
+        if '\\' in line:
+            line = line.replace('\\n', '\n')
+        return line
+    
+    def parse_line(self, line: str, file: str = "", line_number: int = 0) -> Optional[Instruction]:
+        """Парсит одну строку инструкции"""
+        line = self._prepare(line)
+        if line is None:
             return None
-        
-        command = parts[0].strip().upper()
-        
-        # Парсинг по типу команды
-        if command == "SET":
-            if len(parts) >= 3:
-                self.variables[parts[1].strip()] = parts[2].strip()
-                return {"type": "SET", "var": parts[1].strip(), "value": parts[2].strip()}
-                
-        elif command == "FRAME":
-            if len(parts) >= 6:
-                return {
-                    "type": "FRAME",
-                    "title": parts[1].strip(),
-                    "x": float(parts[2]),
-                    "y": float(parts[3]),
-                    "width": float(parts[4]),
-                    "height": float(parts[5])
-                }
-                
-        elif command == "SHAPE":
-            if len(parts) >= 6:
-                return {
-                    "type": "SHAPE",
-                    "name": parts[1].strip(),
-                    "x": float(parts[2]),
-                    "y": float(parts[3]),
-                    "width": float(parts[4]),
-                    "height": float(parts[5]),
-                    "color": parts[6].strip() if len(parts) > 6 else "#4169E1",
-                    "shape": parts[7].strip() if len(parts) > 7 else "rectangle"
-                }
-                
-        elif command == "STICKY":
-            if len(parts) >= 4:
-                return {
-                    "type": "STICKY",
-                    "text": parts[1].strip(),
-                    "x": float(parts[2]),
-                    "y": float(parts[3]),
-                    "color": parts[4].strip() if len(parts) > 4 else "#FFFF99"
-                }
-                
-        elif command == "TEXT":
-            if len(parts) >= 4:
-                return {
-                    "type": "TEXT",
-                    "content": parts[1].strip(),
-                    "x": float(parts[2]),
-                    "y": float(parts[3]),
-                    "size": parts[4].strip() if len(parts) > 4 else "14"
-                }
-                
-        elif command == "LINK":
-            if len(parts) >= 3:
-                return {
-                    "type": "LINK",
-                    "start": parts[1].strip(),
-                    "end": parts[2].strip(),
-                    "label": parts[3].strip() if len(parts) > 3 else ""
-                }
-                
-        elif command == "SLEEP":
-            if len(parts) >= 2:
-                return {
-                    "type": "SLEEP",
-                    "seconds": float(parts[1])
-                }
-                
-        elif command == "PRINT":
-            if len(parts) >= 2:
-                return {
-                    "type": "PRINT",
-                    "message": parts[1].strip()
-                }
-        
-        return None
+        return self._parse_parts(line.split('|'), file, line_number)
+    
+    def _parse_parts(self, parts: List[str], file: str, line_number: int
+                     ) -> Optional[Instruction]:
+        """Парсинг по таблице команд (обычно имя уже в верхнем регистре)"""
+        entry = COMMANDS.get(parts[0])
+        if entry is None:
+            entry = COMMANDS.get(parts[0].strip().upper())
+        if entry is None or len(parts) < entry[0]:
+            return None
+        return entry[1](self, parts, file, line_number)
     
     def load_file(self, file_path: str) -> List[str]:
         """Загружает файл инструкций"""
@@ -115,21 +112,321 @@ class InstructionParser:
             with open(file_path, 'r', encoding='utf-8') as f:
                 return f.readlines()
         except Exception as e:
-            print(f"❌ Ошибка чтения файла {file_path}: {e}")
+            event_log.error(f"❌ Ошибка чтения файла {file_path}: {e}", event="read_error",
+                            file=str(file_path))
             return []
     
-    def parse_file(self, file_path: str) -> List[Dict]:
+    def parse_file(self, file_path: str) -> List[Instruction]:
         """Парсит весь файл инструкций"""
-        lines = self.load_file(file_path)
-        instructions = []
+        return list(self.iter_file(file_path))
+    
+    def iter_file(self, file_path: str) -> Iterator[Instruction]:
+        """Лениво парсит файл построчно (с кешем, если он подключен)
+        
+        Файлы крупнее лимита кеша не накапливаются в памяти и в кеш не
+        попадают - инструкции отдаются сразу по мере чтения. Так же и
+        раскрытые FOR/GRID длиннее лимита, и файлы с INCLUDE других файлов
+        (их изменения не видны в ключе кеша).
+        """
+        key = None
+        collected = None
+        self.errors = []
+        self.templates = {}
+        self.includes = []
+        if self.cache is not None:
+            key = self.cache.key(str(file_path), self.variables)
+            if key is not None:
+                cached = self.cache.load(key)
+                if cached is not None:
+                    instructions, self.variables = cached
+                    yield from instructions
+                    return
+                if os.path.getsize(file_path) <= self.cache.max_file_bytes:
+                    collected = []
         
-        for line in lines:
+        if collected is None:
+            yield from self._iter_lines(file_path)
+            return
+        
+        for instruction in self._iter_lines(file_path):
+            if collected is not None:
+                collected.append(instruction)
+                if len(collected) > self.cache.max_items:
+                    collected = None
+            yield instruction
+        # иначе ошибки не повторятся при чтении из кеша
+        if collected is not None and not self.errors and not self.includes:
+            self.cache.store(key, collected, self.variables)
+    
+    def _iter_lines(self, file_path: str) -> Iterator[Instruction]:
+        """Читает и парсит файл построчно"""
+        try:
+            f = open(file_path, 'r', encoding='utf-8')
+        except Exception as e:
+            event_log.error(f"❌ Ошибка чтения файла {file_path}: {e}", event="read_error",
+                            file=str(file_path))
+            return
+        
+        with f:
+            yield from self._expand(str(file_path), enumerate(f, 1))
+    
+    def _expand(self, file: str, lines: Iterator[Tuple[int, str]]) -> Iterator[Instruction]:
+        """Парсит строки, раскрывая блоки FOR/REPEAT/GRID/TEMPLATE и INCLUDE
+        
+        Тело блока читается из того же итератора lines.
+        """
+        prepare = self._prepare
+        parse_parts = self._parse_parts
+        for line_number, line in lines:
             try:
-                parsed = self.parse_line(line)
+                prepared = prepare(line)
+                if prepared is None:
+                    continue
+                parts = prepared.split('|')
+                if parts[0] not in COMMANDS:
+                    block = BLOCKS.get(parts[0].strip().upper())
+                    if block is not None:
+                        yield from self._block(block, parts, file, line_number, lines)
+                        continue
+                parsed = parse_parts(parts, file, line_number)
                 if parsed:
-                    instructions.append(parsed)
+                    yield parsed
+                else:
+                    self.errors.append((file, line_number,
+                                        f"неизвестная команда или не хватает полей: "
+                                        f"{line.strip()[:60]}"))
             except Exception as e:
-                print(f"⚠️  Ошибка парсинга строки: {e}")
+                event_log.warning(f"⚠️  Ошибка парсинга строки: {e}", event="parse_error",
+                                  file=file, line=line_number)
+                self.errors.append((file, line_number, f"ошибка парсинга: {e}"))
                 continue
+    
+    def _block(self, block: "Block", parts: List[str], file: str, line_number: int,
+               lines: Iterator[Tuple[int, str]]) -> Iterator[Instruction]:
+        """Читает тело блока до END и раскрывает его"""
+        name = parts[0].strip().upper()
+        body = _read_body(name, lines) if block.has_body else []
+        if len(parts) < block.min_parts:
+            raise ValueError(f"{name}: не хватает полей")
+        yield from block.expand(self, parts, file, line_number, body)
+    
+    def _repeat(self, names: Tuple[str, ...], rows: Iterable[Tuple[str, ...]], file: str,
+                body: List[Tuple[int, str]]) -> Iterator[Instruction]:
+        """Раскрывает тело для каждого набора значений переменных names
         
-        return instructions
+        Прежние значения переменных возвращаются после блока.
+        """
+        variables = self.variables
+        saved = {name: variables.get(name) for name in names}
+        try:
+            for row in rows:
+                variables.update(zip(names, row))
+                yield from self._expand(file, iter(body))
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    variables.pop(name, None)
+                else:
+                    variables[name] = value
+
+def parse_file_job(file_path: str, variables: Dict[str, str]) -> List[Instruction]:
+    """Парсинг и авто-раскладка файла в отдельном процессе (для ProcessPoolExecutor)"""
+    parser = InstructionParser(default_cache())
+    parser.variables = dict(variables)
+    return list(apply_layout(parser.iter_file(file_path)))
+
+@register_command("SET", 3)
+def _parse_set(parser: InstructionParser, parts: List[str], file: str, line: int):
+    var, value = parts[1].strip(), _value(parts[2].strip())
+    parser.variables[var] = value
+    return SetVar(var, value, file, line)
+
+@register_command("FRAME", 6)
+def _parse_frame(parser: InstructionParser, parts: List[str], file: str, line: int):
+    return Frame(parts[1].strip(), _float(parts[2]), _float(parts[3]),
+                 _float(parts[4]), _float(parts[5]), file, line)
+
+def _coordinate(value: str) -> Optional[float]:
+    """Координата фигуры или None для auto"""
+    try:
+        return _float(value)
+    except ValueError:
+        if value.strip().lower() == AUTO:
+            return None
+        raise
+
+@register_command("SHAPE", 6)
+def _parse_shape(parser: InstructionParser, parts: List[str], file: str, line: int):
+    return Shape(parts[1].strip(), _coordinate(parts[2]), _coordinate(parts[3]),
+                 _float(parts[4]), _float(parts[5]),
+                 parts[6].strip() if len(parts) > 6 else "#4169E1",
+                 parts[7].strip() if len(parts) > 7 else "rectangle",
+                 file, line)
+
+@register_command("STICKY", 4)
+def _parse_sticky(parser: InstructionParser, parts: List[str], file: str, line: int):
+    return Sticky(parts[1].strip(), _float(parts[2]), _float(parts[3]),
+                  parts[4].strip() if len(parts) > 4 else "#FFFF99", file, line)
+
+@register_command("TEXT", 4)
+def _parse_text(parser: InstructionParser, parts: List[str], file: str, line: int):
+    return Text(parts[1].strip(), _float(parts[2]), _float(parts[3]),
+                _calculate(parts[4].strip()) if len(parts) > 4 else "14", file, line)
+
+@register_command("LINK", 3)
+def _parse_link(parser: InstructionParser, parts: List[str], file: str, line: int):
+    return Link(parts[1].strip(), parts[2].strip(),
+                parts[3].strip() if len(parts) > 3 else "", file, line)
+
+@register_command("LAYOUT", 2)
+def _parse_layout(parser: InstructionParser, parts: List[str], file: str, line: int):
+    mode = parts[1].strip().lower()
+    if mode not in LAYOUTS:
+        raise ValueError(f"неизвестная раскладка '{mode}', доступны: {', '.join(LAYOUTS)}")
+    numbers = [_float(part) for part in parts[2:6]]
+    return Layout(mode, *numbers, file=file, line=line)
+
+@register_command("SLEEP", 2)
+def _parse_sleep(parser: InstructionParser, parts: List[str], file: str, line: int):
+    return Sleep(_float(parts[1]), file, line)
+
+@register_command("PRINT", 2)
+def _parse_print(parser: InstructionParser, parts: List[str], file: str, line: int):
+    return Print(parts[1].strip(), file, line)
+
+def _number(value: float) -> str:
+    """Число для подстановки в строку: целые без .0"""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+}
+
+def _arithmetic(node: ast.AST) -> float:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_arithmetic(node.left), _arithmetic(node.right))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _arithmetic(node.operand)
+        return -value if isinstance(node.op, ast.USub) else value
+    raise ValueError("допустимы только числа, + - * / // % и скобки")
+
+def _calculate(value: str) -> str:
+    """Числовое поле: значения выражений в фигурных скобках"""
+    return EXPRESSION.sub(_evaluate, value) if '{' in value else value
+
+def _float(value: str) -> float:
+    return float(_calculate(value))
+
+def _value(value: str) -> str:
+    """Значение SET или аргумент INCLUDE: вычисляется, только если это
+    выражение целиком ({$x + 200}); иначе остается текстом"""
+    if '{' in value and EXPRESSION.fullmatch(value):
+        return _calculate(value)
+    return value
+
+def _evaluate(match: "re.Match") -> str:
+    """Значение выражения в фигурных скобках"""
+    try:
+        return _number(_arithmetic(ast.parse(match.group(1).strip(), mode="eval").body))
+    except (SyntaxError, ZeroDivisionError, ValueError) as e:
+        raise ValueError(f"выражение {{{match.group(1)}}}: {e}")
+
+def _read_body(name: str, lines: Iterator[Tuple[int, str]]) -> List[Tuple[int, str]]:
+    """Строки тела блока до парного END (вложенные блоки остаются в теле)"""
+    body = []
+    depth = 0
+    for line_number, line in lines:
+        head = line.split('|', 1)[0].strip().upper()
+        if head == "END":
+            if not depth:
+                return body
+            depth -= 1
+        elif head in BLOCKS and BLOCKS[head].has_body:
+            depth += 1
+        body.append((line_number, line))
+    raise ValueError(f"{name}: нет END до конца файла")
+
+@register_block("FOR", 4)
+def _expand_for(parser: InstructionParser, parts: List[str], file: str, line: int,
+                body: List[Tuple[int, str]]):
+    """FOR|переменная|от|до|[шаг] - границы включительно"""
+    var = parts[1].strip()
+    start, end = _float(parts[2]), _float(parts[3])
+    step = _float(parts[4]) if len(parts) > 4 else (1.0 if end >= start else -1.0)
+    if not var:
+        raise ValueError("FOR: пустое имя переменной")
+    if step == 0:
+        raise ValueError("FOR: шаг 0")
+    count = max(0, math.floor((end - start) / step + 1e-9) + 1)
+    yield from parser._repeat((var,), ((_number(start + i * step),) for i in range(count)),
+                              file, body)
+
+@register_block("REPEAT", 2)
+def _expand_repeat(parser: InstructionParser, parts: List[str], file: str, line: int,
+                   body: List[Tuple[int, str]]):
+    """REPEAT|количество|[переменная] - номер повтора с 0 (по умолчанию $i)"""
+    var = parts[2].strip() if len(parts) > 2 else "i"
+    yield from parser._repeat((var,), ((str(i),) for i in range(int(_calculate(parts[1])))),
+                              file, body)
+
+@register_block("GRID", 7)
+def _expand_grid(parser: InstructionParser, parts: List[str], file: str, line: int,
+                 body: List[Tuple[int, str]]):
+    """GRID|строк|столбцов|x|y|шаг_x|шаг_y - тело для каждой ячейки
+
+    В теле доступны $row, $col, $n (номер ячейки с 0) и $x, $y ячейки.
+    """
+    rows, columns = int(_calculate(parts[1])), int(_calculate(parts[2]))
+    x, y, step_x, step_y = (_float(part) for part in parts[3:7])
+    xs = [_number(x + column * step_x) for column in range(columns)]
+    cells = ((str(row), str(column), str(row * columns + column), xs[column],
+              _number(y + row * step_y))
+             for row in range(rows) for column in range(columns))
+    yield from parser._repeat(("row", "col", "n", "x", "y"), cells, file, body)
+
+@register_block("TEMPLATE", 2)
+def _define_template(parser: InstructionParser, parts: List[str], file: str, line: int,
+                     body: List[Tuple[int, str]]):
+    """TEMPLATE|имя|параметры... - запоминает тело, инструкций не дает"""
+    name = parts[1].strip()
+    if not name:
+        raise ValueError("TEMPLATE: пустое имя")
+    parser.templates[name] = Template([part.strip() for part in parts[2:]], body, file)
+    return iter(())
+
+@register_block("INCLUDE", 2, has_body=False)
+def _include(parser: InstructionParser, parts: List[str], file: str, line: int,
+             body: List[Tuple[int, str]]):
+    """INCLUDE|шаблон|аргументы... или INCLUDE|файл (путь от текущего файла)"""
+    name = parts[1].strip()
+    template = parser.templates.get(name)
+    if template is not None:
+        args = [_value(part.strip()) for part in parts[2:]]
+        if len(args) < len(template.params):
+            raise ValueError(f"INCLUDE {name}: ожидается параметров {len(template.params)}")
+        yield from parser._repeat(tuple(template.params), [args], template.file,
+                                  template.body)
+        return
+    
+    path = os.path.join(os.path.dirname(file), name)
+    if not os.path.isfile(path):
+        raise ValueError(f"INCLUDE: нет шаблона или файла '{name}'")
+    target = os.path.realpath(path)
+    current = os.path.realpath(file)
+    if target == current or target in parser._including:
+        raise ValueError(f"INCLUDE: циклическое подключение '{name}'")
+    parser.includes.append(target)
+    parser._including.append(current)
+    try:
+        yield from parser._iter_lines(os.path.normpath(path))
+    finally:
+        parser._including.pop()
+
+@register_block("END", 1, has_body=False)
+def _stray_end(parser: InstructionParser, parts: List[str], file: str, line: int,
+               body: List[Tuple[int, str]]):
+    raise ValueError("END без начала блока")
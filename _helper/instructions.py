@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instructions - компактные записи распарсенных инструкций
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+
+# Служебные поля: откуда инструкция и в какой рамке лежит, на содержимое не влияют
+META_FIELDS = ("file", "line", "parent")
+
+# Рамка-родитель элемента: (заголовок, левый край, верхний край)
+Parent = Optional[Tuple[str, float, float]]
+
+# Рамки хранятся в MiroAPI.elements рядом с фигурами под этим префиксом
+FRAME_PREFIX = "frame:"
+
+class SetVar(NamedTuple):
+    """SET|переменная|значение"""
+    type = "SET"
+    var: str
+    value: str
+    file: str = ""
+    line: int = 0
+
+class Frame(NamedTuple):
+    """FRAME|заголовок|x|y|width|height"""
+    type = "FRAME"
+    title: str
+    x: float
+    y: float
+    width: float
+    height: float
+    file: str = ""
+    line: int = 0
+
+class Shape(NamedTuple):
+    """SHAPE|имя|x|y|width|height|цвет|форма (x/y = auto - расставит auto_layout)"""
+    type = "SHAPE"
+    name: str
+    x: Optional[float]
+    y: Optional[float]
+    width: float
+    height: float
+    color: str = "#4169E1"
+    shape: str = "rectangle"
+    file: str = ""
+    line: int = 0
+    parent: Parent = None
+
+class Sticky(NamedTuple):
+    """STICKY|текст|x|y|цвет"""
+    type = "STICKY"
+    text: str
+    x: float
+    y: float
+    color: str = "#FFFF99"
+    file: str = ""
+    line: int = 0
+    parent: Parent = None
+
+class Text(NamedTuple):
+    """TEXT|текст|x|y|размер"""
+    type = "TEXT"
+    content: str
+    x: float
+    y: float
+    size: str = "14"
+    file: str = ""
+    line: int = 0
+    parent: Parent = None
+
+class Link(NamedTuple):
+    """LINK|начало|конец|подпись"""
+    type = "LINK"
+    start: str
+    end: str
+    label: str = ""
+    file: str = ""
+    line: int = 0
+
+class Layout(NamedTuple):
+    """LAYOUT|layered или grid|x|y|отступ_x|отступ_y"""
+    type = "LAYOUT"
+    mode: str
+    x: float = 0.0
+    y: float = 0.0
+    gap_x: float = 60.0
+    gap_y: float = 100.0
+    file: str = ""
+    line: int = 0
+
+class Sleep(NamedTuple):
+    """SLEEP|секунды"""
+    type = "SLEEP"
+    seconds: float
+    file: str = ""
+    line: int = 0
+
+class Print(NamedTuple):
+    """PRINT|сообщение"""
+    type = "PRINT"
+    message: str
+    file: str = ""
+    line: int = 0
+
+Instruction = Union[SetVar, Frame, Shape, Sticky, Text, Link, Layout, Sleep, Print]
+
+def element_name(instruction: Instruction) -> Optional[str]:
+    """Ключ элемента в MiroAPI.elements: имя фигуры или заголовок рамки"""
+    if instruction.type == "SHAPE":
+        return instruction.name
+    if instruction.type == "FRAME":
+        return FRAME_PREFIX + instruction.title
+    return None
+
+def content(instruction: Instruction) -> Dict[str, Any]:
+    """Содержимое инструкции без служебных полей (для хешей и сравнения)"""
+    data = {field: value for field, value in zip(instruction._fields, instruction)
+            if field not in META_FIELDS}
+    data["type"] = instruction.type
+    return data
@@ -5,11 +5,13 @@ Menu Handler - обработка меню и пользовательского
 """
 
 import sys
-import time
 import getpass
 from pathlib import Path
 from typing import List
 
+from . import settings
+from .board_reset import RESET_TYPES, parse_types
+
 class MenuHandler:
     """Обработчик меню и пользовательского интерфейса"""
     
@@ -72,8 +74,8 @@ class MenuHandler:
         else:
             return files
     
-    def process_instructions(self, engine, board_id: str):
-        """Обработка инструкций"""
+    def process_instructions(self, engine, board_id: str, sync: bool = False):
+        """Обработка инструкций (sync=True - только изменения с прошлого раза)"""
         # Находим файлы инструкций
         print("\n📂 Поиск файлов инструкций...")
         print("-"*60)
@@ -90,6 +92,9 @@ class MenuHandler:
             print("❌ Файлы не выбраны")
             return False
         
+        if not engine.validate(selected_files):
+            return False
+        
         # Подтверждение
         print(f"\n📌 Будет обработано файлов: {len(selected_files)}")
         confirm = input("➤ Начать создание? (да/нет): ").strip().lower()
@@ -103,18 +108,88 @@ class MenuHandler:
         print("🎯 НАЧИНАЮ ОБРАБОТКУ")
         print("="*60)
         
-        for file_path in selected_files:
-            engine.process_file(file_path)
-            time.sleep(1)
+        if settings.SNAPSHOT and not sync:
+            engine.snapshot()
+        
+        if settings.PARALLEL_FILES and not sync and len(selected_files) > 1:
+            engine.process_files(selected_files)
+        else:
+            for file_path in selected_files:
+                if sync:
+                    engine.sync_file(file_path)
+                else:
+                    engine.process_file(file_path)
+        engine.complete_run()
         
         # Статистика
         engine.executor.print_stats()
+        engine.executor.snapshot = None  # снимок устарел: на доске новые элементы
         
         print(f"\n🔗 Откройте доску для просмотра:")
         print(f"   https://miro.com/app/board/{board_id}/")
         print("\n✅ Готово!")
         return True
     
+    def fan_out(self, engine):
+        """Публикация выбранных файлов на несколько досок"""
+        print("\n📤 ПУБЛИКАЦИЯ НА НЕСКОЛЬКО ДОСОК")
+        print("-"*60)
+        
+        files = engine.find_instruction_files()
+        if not files:
+            print("⚠️  Не найдено файлов инструкций!")
+            return False
+        
+        selected_files = self.select_files(files)
+        if not selected_files:
+            print("❌ Файлы не выбраны")
+            return False
+        
+        raw_ids = input("\n➤ Введите Board ID через запятую: ").strip()
+        board_ids = list(dict.fromkeys(b.strip() for b in raw_ids.split(',') if b.strip()))
+        if not board_ids:
+            print("❌ Доски не указаны")
+            return False
+        
+        if not engine.validate(selected_files, board_ids):
+            return False
+        
+        print(f"\n📌 Файлов: {len(selected_files)}, досок: {len(board_ids)}")
+        confirm = input("➤ Начать публикацию? (да/нет): ").strip().lower()
+        if confirm not in ["да", "yes", "y", "д"]:
+            print("⚠️  Отменено")
+            return False
+        
+        engine.fan_out(selected_files, board_ids)
+        return True
+    
+    def reset_board(self, engine, board_id: str):
+        """Очистка доски: созданное движком или все элементы выбранных типов"""
+        print("\n🧹 ОЧИСТКА ДОСКИ")
+        print("-"*60)
+        print("  1. Удалить созданное движком (журнал, реестр, синхронизация)")
+        print("  2. Удалить все элементы выбранных типов")
+        
+        choice = input("Выбор (1/2): ").strip()
+        types = None
+        if choice == "2":
+            raw = input(f"Типы через запятую ({', '.join(RESET_TYPES)}) "
+                        f"или Enter - все: ").strip()
+            types = parse_types(raw or "all")
+            if types == []:
+                return False
+        elif choice != "1":
+            print("⚠️  Отменено")
+            return False
+        
+        what = "созданное движком" if types is None else ", ".join(types)
+        confirm = input(f"➤ Удалить {what} с доски {board_id}? (да/нет): ").strip().lower()
+        if confirm not in ["да", "yes", "y", "д"]:
+            print("⚠️  Отменено")
+            return False
+        
+        return engine.reset(types)
+    
     def change_token(self, engine_class, board_id: str):
         """Смена токена"""
         print("\n🔑 СМЕНА ТОКЕНА")
@@ -168,9 +243,13 @@ class MenuHandler:
         print("🔄 ГЛАВНОЕ МЕНЮ")
         print("="*60)
         print("1. Обработать инструкции")
-        print("2. Показать доступные файлы")
-        print("3. Сменить токен")
-        print("4. Сменить доску")
-        print("5. Выход")
-        
-        return input("\n➤ Выберите действие (1-5): ").strip()
+        print("2. Синхронизировать изменения")
+        print("3. Опубликовать на несколько досок")
+        print("4. Снимок доски (пропустить уже созданное)")
+        print("5. Очистить доску")
+        print("6. Показать доступные файлы")
+        print("7. Сменить токен")
+        print("8. Сменить доску")
+        print("9. Выход")
+        
+        return input("\n➤ Выберите действие (1-9): ").strip()
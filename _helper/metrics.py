@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Metrics - метрики запросов к Miro API и экспорт в JSON/Prometheus
+"""
+
+import os
+import json
+import bisect
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5,
+                   0.75, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: память не растет с числом запросов"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя - +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, share: float) -> float:
+        """Оценка перцентиля линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = share * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+class Metrics:
+    """Счетчики запросов по эндпоинтам и результатов по типам команд"""
+
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.bytes_sent: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.in_flight_max: Dict[str, int] = {}
+        self.retries: Dict[str, Dict[str, int]] = {}
+        self.items: Dict[str, Dict[str, int]] = {}
+        self.gauges: Dict[str, float] = {}
+        self._gauge_help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def request_started(self, endpoint: str):
+        """Запрос ушел в сеть"""
+        with self._lock:
+            current = self.in_flight.get(endpoint, 0) + 1
+            self.in_flight[endpoint] = current
+            if current > self.in_flight_max.get(endpoint, 0):
+                self.in_flight_max[endpoint] = current
+
+    def request_finished(self, endpoint: str, status: str, seconds: float, sent: int = 0):
+        """Ответ получен (status - код ответа или имя ошибки)"""
+        with self._lock:
+            self.in_flight[endpoint] -= 1
+            self.latency.setdefault(endpoint, Histogram()).observe(seconds)
+            codes = self.statuses.setdefault(endpoint, {})
+            codes[status] = codes.get(status, 0) + 1
+            self.bytes_sent[endpoint] = self.bytes_sent.get(endpoint, 0) + sent
+
+    def retry(self, endpoint: str, reason: str):
+        """Повтор запроса (429, 5xx, network)"""
+        with self._lock:
+            reasons = self.retries.setdefault(endpoint, {})
+            reasons[reason] = reasons.get(reason, 0) + 1
+
+    def item(self, cmd_type: str, ok: bool):
+        """Результат команды исполнителя"""
+        with self._lock:
+            results = self.items.setdefault(cmd_type, {"success": 0, "failure": 0})
+            results["success" if ok else "failure"] += 1
+
+    def set_gauge(self, name: str, value: float, help_text: str = ""):
+        """Текущее значение показателя (miro_<name> в Prometheus)"""
+        with self._lock:
+            self.gauges[name] = value
+            if help_text and name not in self._gauge_help:
+                self._gauge_help[name] = help_text
+
+    def totals(self) -> Dict[str, int]:
+        """Сводные счетчики для строки прогресса"""
+        with self._lock:
+            return {
+                "success": sum(results["success"] for results in self.items.values()),
+                "failure": sum(results["failure"] for results in self.items.values()),
+                "retries": sum(sum(reasons.values()) for reasons in self.retries.values()),
+                "in_flight": sum(self.in_flight.values()),
+                "concurrency_limit": int(self.gauges.get("concurrency_limit", 0)),
+            }
+
+    def to_dict(self) -> Dict:
+        """Снимок метрик для JSON"""
+        with self._lock:
+            endpoints = {}
+            for endpoint in sorted(set(self.latency) | set(self.statuses) | set(self.retries)):
+                histogram = self.latency.get(endpoint, Histogram())
+                endpoints[endpoint] = {
+                    "requests": histogram.count,
+                    "latency_seconds": {
+                        "p50": histogram.percentile(0.50),
+                        "p95": histogram.percentile(0.95),
+                        "p99": histogram.percentile(0.99),
+                        "max": histogram.max,
+                        "sum": histogram.sum,
+                    },
+                    "statuses": dict(self.statuses.get(endpoint, {})),
+                    "retries": dict(self.retries.get(endpoint, {})),
+                    "bytes_sent": self.bytes_sent.get(endpoint, 0),
+                    "in_flight": self.in_flight.get(endpoint, 0),
+                    "in_flight_max": self.in_flight_max.get(endpoint, 0),
+                }
+            return {"endpoints": endpoints,
+                    "items": {k: dict(v) for k, v in self.items.items()},
+                    "gauges": dict(self.gauges)}
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            header("miro_request_duration_seconds", "histogram",
+                   "Длительность запросов к Miro API")
+            for endpoint, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'miro_request_duration_seconds_bucket'
+                                 f'{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'miro_request_duration_seconds_bucket'
+                             f'{{endpoint="{endpoint}",le="+Inf"}} {histogram.count}')
+                lines.append(f'miro_request_duration_seconds_sum{{endpoint="{endpoint}"}} '
+                             f'{histogram.sum:.6f}')
+                lines.append(f'miro_request_duration_seconds_count{{endpoint="{endpoint}"}} '
+                             f'{histogram.count}')
+
+            header("miro_requests_total", "counter", "Ответы Miro API по кодам")
+            for endpoint, codes in sorted(self.statuses.items()):
+                for status, count in sorted(codes.items()):
+                    lines.append(f'miro_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            header("miro_retries_total", "counter", "Повторы запросов по причинам")
+            for endpoint, reasons in sorted(self.retries.items()):
+                for reason, count in sorted(reasons.items()):
+                    lines.append(f'miro_retries_total{{endpoint="{endpoint}",reason="{reason}"}} {count}')
+
+            header("miro_request_bytes_total", "counter", "Отправлено байт тела запросов")
+            for endpoint, sent in sorted(self.bytes_sent.items()):
+                lines.append(f'miro_request_bytes_total{{endpoint="{endpoint}"}} {sent}')
+
+            header("miro_in_flight_requests", "gauge", "Запросы в работе")
+            for endpoint, current in sorted(self.in_flight.items()):
+                lines.append(f'miro_in_flight_requests{{endpoint="{endpoint}"}} {current}')
+
+            header("miro_in_flight_requests_max", "gauge", "Пик одновременных запросов")
+            for endpoint, peak in sorted(self.in_flight_max.items()):
+                lines.append(f'miro_in_flight_requests_max{{endpoint="{endpoint}"}} {peak}')
+
+            header("miro_items_total", "counter", "Команды исполнителя по результату")
+            for cmd_type, results in sorted(self.items.items()):
+                for result, count in sorted(results.items()):
+                    lines.append(f'miro_items_total{{type="{cmd_type}",result="{result}"}} {count}')
+
+            for name, value in sorted(self.gauges.items()):
+                header(f"miro_{name}", "gauge", self._gauge_help.get(name, name))
+                lines.append(f"miro_{name} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: Path) -> Tuple[Path, Path]:
+        """Пишет metrics.json и metrics.prom
+
+        Файлы заменяются целиком (запись во временный и os.replace), поэтому
+        textfile collector node_exporter не прочитает их наполовину.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        json_path = directory / "metrics.json"
+        prom_path = directory / "metrics.prom"
+        _write_atomic(json_path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+        _write_atomic(prom_path, self.to_prometheus())
+        return json_path, prom_path
+
+    def print_summary(self):
+        """Краткая сводка задержек по эндпоинтам"""
+        for endpoint, data in self.to_dict()["endpoints"].items():
+            latency = data["latency_seconds"]
+            errors = sum(count for status, count in data["statuses"].items()
+                         if not status.startswith("2"))
+            retries = sum(data["retries"].values())
+            print(f"  • {endpoint}: {data['requests']} запросов, "
+                  f"p50 {latency['p50'] * 1000:.0f} мс, p95 {latency['p95'] * 1000:.0f} мс, "
+                  f"p99 {latency['p99'] * 1000:.0f} мс, ошибок {errors}, повторов {retries}")
+        for name, value in sorted(self.gauges.items()):
+            print(f"  • {self._gauge_help.get(name, name)}: {value:g}")
+
+def _write_atomic(path: Path, text: str):
+    """Записывает файл через временный в том же каталоге"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
@@ -4,85 +4,354 @@
 Miro API Client - работа с API Miro
 """
 
+import re
+import time
+import random
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from typing import Optional, Dict, Any, Iterator, List, MutableMapping, Tuple, Union
+
+from . import settings, event_log
+from .rate_limiter import RateLimiter
+from .concurrency_limiter import ConcurrencyLimiter
+from .metrics import Metrics
+from .instructions import FRAME_PREFIX, Parent
 
 class MiroAPI:
     """Клиент для работы с Miro API"""
     
-    def __init__(self, token: str, board_id: str):
+    # Пакетное создание: до 20 элементов этих типов в одном запросе
+    BULK_LIMIT = 20
+    BULK_TYPES = {"shapes": "shape", "sticky_notes": "sticky_note", "texts": "text"}
+    
+    # Максимальный размер страницы для GET списков
+    PAGE_LIMIT = 50
+    
+    # Допустимые формы фигур Miro
+    SHAPE_TYPES = (
+        "rectangle", "round_rectangle", "circle", "triangle", "rhombus",
+        "parallelogram", "trapezoid", "pentagon", "hexagon", "octagon",
+        "wedge_round_rectangle_callout", "star", "flow_chart_predefined_process",
+        "cloud", "cross", "can", "right_arrow", "left_arrow", "left_right_arrow",
+        "left_brace", "right_brace"
+    )
+    
+    # Цвета стикеров Miro и HEX цвета, которые к ним приводятся
+    STICKY_COLORS = (
+        "gray", "light_yellow", "yellow", "orange", "light_green", "green",
+        "dark_green", "cyan", "light_pink", "pink", "violet", "red",
+        "light_blue", "blue", "dark_blue", "black"
+    )
+    STICKY_HEX = {
+        "#FFE4E4": "light_pink",
+        "#FFE4CC": "orange",
+        "#E6F3FF": "light_blue",
+        "#E6FFE6": "light_green",
+        "#E0E0E0": "gray",
+        "#FFFF99": "light_yellow",
+        "#FFFF00": "yellow",
+        "#FFD700": "yellow"
+    }
+    
+    def __init__(self, token: str, board_id: str,
+                 pool_size: int = settings.POOL_SIZE,
+                 connect_timeout: float = settings.CONNECT_TIMEOUT,
+                 read_timeout: float = settings.READ_TIMEOUT,
+                 limiter: Optional[RateLimiter] = None,
+                 elements: Optional[MutableMapping[str, str]] = None,
+                 session: Optional[requests.Session] = None,
+                 metrics: Optional[Metrics] = None,
+                 concurrency: Optional[ConcurrencyLimiter] = None):
         self.token = token
         self.board_id = board_id
-        self.base_url = "https://api.miro.com/v2"
+        self.base_url = settings.BASE_URL
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
-        self.elements = {}  # {name: id} для связей
+        self.timeout = (connect_timeout, read_timeout)
+        # Сессию и планировщик можно разделить между клиентами разных досок
+        self.session = session or self._create_session(pool_size)
+        self.limiter = limiter or RateLimiter(settings.RATE_LIMIT, settings.RATE_BURST,
+                                              settings.RETRY_AFTER_DEFAULT)
+        self.metrics = metrics or Metrics()
+        # Адаптивный предел запросов в полете (общий, как и планировщик)
+        if concurrency is None and settings.ADAPTIVE_CONCURRENCY:
+            concurrency = ConcurrencyLimiter(settings.CONCURRENCY_START,
+                                             settings.CONCURRENCY_MAX,
+                                             tolerance=settings.LATENCY_TOLERANCE)
+        self.concurrency = concurrency
+        # {name: id} для связей; словарь или постоянный ElementRegistry
+        self.elements = elements if elements is not None else {}
+    
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """Создает сессию с keep-alive пулом соединений"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Статистика переиспользования соединений пула"""
+        connections = requests_sent = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        return {
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": max(0, requests_sent - connections)
+        }
+    
+    def close(self):
+        """Закрывает соединения пула"""
+        self.session.close()
+        
+    def _request(self, method: str, url: str, endpoint: str,
+                 data: Optional[Any] = None) -> requests.Response:
+        """Запрос через планировщик с повторами
         
-    def api_call(self, endpoint: str, data: dict) -> Optional[str]:
-        """Универсальный API вызов"""
+        После 429 выдерживает Retry-After, после таймаута, обрыва соединения
+        или 5xx повторяет запрос с экспоненциальной паузой и jitter. Каждая
+        попытка занимает место в адаптивном пределе запросов в полете.
+        POST после таймаута чтения не повторяется: сервер мог уже создать
+        элемент, и повтор дал бы дубль, невидимый журналу и реестру.
+        """
+        rate_limited = 0
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            # Место берется после токена: ожидание планировщика - не запрос в полете
+            slot = self.concurrency.acquire() if self.concurrency else 0.0
+            start = time.perf_counter()
+            try:
+                response = self._send(method, url, endpoint, data)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                self._release(slot, endpoint, None, overloaded=True)
+                if attempt >= settings.RETRIES or (method == "POST" and _sent(e)):
+                    raise
+                attempt += 1
+                self.metrics.retry(endpoint, "network")
+                self._backoff(endpoint, attempt, "нет ответа")
+                continue
+            except Exception:
+                self._release(slot, endpoint, None)
+                raise
+            
+            self._release(slot, endpoint, time.perf_counter() - start,
+                          overloaded=response.status_code == 429 or response.status_code >= 500)
+            self.limiter.update(response.headers)
+            if response.status_code == 429 and rate_limited < settings.RATE_LIMIT_RETRIES:
+                rate_limited += 1
+                self.metrics.retry(endpoint, "429")
+                delay = self.limiter.retry_after(response.headers)
+                event_log.debug(f"  ⏳ Лимит запросов для {endpoint}, пауза {delay:.1f} сек",
+                                event="rate_limited", endpoint=endpoint, delay=round(delay, 3))
+                continue
+            if response.status_code >= 500 and attempt < settings.RETRIES:
+                attempt += 1
+                self.metrics.retry(endpoint, "5xx")
+                self._backoff(endpoint, attempt, f"ошибка {response.status_code}")
+                continue
+            return response
+    
+    def _release(self, slot: float, endpoint: str, seconds: Optional[float],
+                 overloaded: bool = False):
+        """Возвращает место в пределе запросов и публикует предел в метриках"""
+        if self.concurrency is None:
+            return
+        self.concurrency.release(slot, endpoint, seconds, overloaded)
+        self.metrics.set_gauge("concurrency_limit", self.concurrency.limit,
+                               "Предел одновременных запросов (AIMD)")
+    
+    def _send(self, method: str, url: str, endpoint: str,
+              data: Optional[Any]) -> requests.Response:
+        """Один HTTP запрос с замером задержки, кода ответа и объема"""
+        self.metrics.request_started(endpoint)
+        start = time.perf_counter()
+        try:
+            if isinstance(data, bytes):  # тело уже сериализовано (plan_compiler)
+                response = self.session.request(method, url, data=data, timeout=self.timeout)
+            else:
+                response = self.session.request(method, url, json=data, timeout=self.timeout)
+        except Exception as e:
+            self.metrics.request_finished(endpoint, type(e).__name__,
+                                          time.perf_counter() - start)
+            raise
+        body = response.request.body
+        self.metrics.request_finished(endpoint, str(response.status_code),
+                                      time.perf_counter() - start,
+                                      len(body) if body else 0)
+        return response
+    
+    def _backoff(self, endpoint: str, attempt: int, reason: str):
+        """Пауза перед повтором: full jitter от экспоненциальной задержки"""
+        delay = random.uniform(0, min(settings.BACKOFF_MAX,
+                                      settings.BACKOFF_BASE * 2 ** attempt))
+        event_log.info(f"  ↻ {endpoint}: {reason}, повтор {attempt}/{settings.RETRIES} "
+                       f"через {delay:.1f} сек", event="retry", endpoint=endpoint,
+                       reason=reason, attempt=attempt, delay=round(delay, 3))
+        time.sleep(delay)
+    
+    def api_call(self, endpoint: str, data: Union[dict, bytes]) -> Optional[str]:
+        """Универсальный API вызов (data - словарь или готовое JSON тело)"""
         url = f"{self.base_url}/boards/{self.board_id}/{endpoint}"
         
         try:
-            response = requests.post(url, headers=self.headers, json=data, timeout=10)
+            response = self._request("POST", url, endpoint, data)
             if response.status_code == 201:
                 return response.json().get("id")
-            else:
-                print(f"⚠️  API ошибка {response.status_code} для {endpoint}")
-                try:
-                    error_details = response.json()
-                    
-                    # Специальная обработка ошибки цвета стикера
-                    if (endpoint == "sticky_notes" and 
-                        error_details.get('code') == '2.0703' and
-                        'style.fillColor' in str(error_details)):
-                        
-                        # Извлекаем неправильный цвет из ошибки
-                        context = error_details.get('context', {})
-                        fields = context.get('fields', [])
-                        for field in fields:
-                            if field.get('field') == 'style.fillColor':
-                                message = field.get('message', '')
-                                # Ищем цвет в сообщении типа "Unexpected value [#E0E0E0]"
-                                import re
-                                color_match = re.search(r'\[([#\w]+)\]', message)
-                                if color_match:
-                                    wrong_color = color_match.group(1)
-                                    print(f"    ❌ Неправильный цвет стикера: {wrong_color}")
-                                    print(f"    💡 Для стикеров используйте только: gray, light_yellow, yellow, orange,")
-                                    print(f"       light_green, green, dark_green, cyan, light_pink, pink, violet,")
-                                    print(f"       red, light_blue, blue, dark_blue, black")
-                                    return None
-                    
-                    # Для остальных ошибок показываем детали
-                    print(f"    Детали: {error_details}")
-                except:
-                    print(f"    Ответ: {response.text[:200]}")
-                return None
+            self._report_error(endpoint, response)
+            return None
         except requests.exceptions.Timeout:
-            print(f"⚠️  Таймаут для {endpoint}")
+            event_log.warning(f"⚠️  Таймаут для {endpoint}", event="timeout", endpoint=endpoint)
             return None
         except Exception as e:
-            print(f"❌ Ошибка {endpoint}: {e}")
+            event_log.error(f"❌ Ошибка {endpoint}: {e}", event="error", endpoint=endpoint)
             return None
     
-    def create_frame(self, title: str, x: float, y: float, 
-                    width: float, height: float) -> Optional[str]:
-        """Создает рамку"""
-        data = {
+    def _report_error(self, endpoint: str, response: requests.Response):
+        """Одна строка об ошибке API; полный ответ - в поле details JSON лога"""
+        try:
+            details = response.json()
+        except ValueError:
+            details = {"message": response.text[:200]}
+        if not isinstance(details, dict):
+            details = {"message": str(details)[:200]}
+        
+        wrong_color = self._sticky_color_error(endpoint, details)
+        if wrong_color:
+            message = (f"❌ Неправильный цвет стикера: {wrong_color}. "
+                       f"Для стикеров используйте только: {', '.join(self.STICKY_COLORS)}")
+        else:
+            message = f"⚠️  API ошибка {response.status_code} для {endpoint}"
+            if details.get("message"):
+                message += f": {details['message']}"
+        event_log.warning(message, event="api_error", endpoint=endpoint,
+                          status=response.status_code, details=details)
+    
+    @staticmethod
+    def _sticky_color_error(endpoint: str, details: dict) -> Optional[str]:
+        """Неправильный цвет из ошибки стикера ("Unexpected value [#E0E0E0]")"""
+        if (endpoint != "sticky_notes" or details.get('code') != '2.0703' or
+                'style.fillColor' not in str(details)):
+            return None
+        for field in details.get('context', {}).get('fields', []):
+            if field.get('field') == 'style.fillColor':
+                color_match = re.search(r'\[([#\w]+)\]', field.get('message', ''))
+                if color_match:
+                    return color_match.group(1)
+        return None
+    
+    def bulk_create(self, items: List[Tuple[str, dict]]) -> Optional[List[str]]:
+        """Создает пачку элементов одним запросом, возвращает id в том же порядке
+        
+        items - пары (эндпоинт, тело запроса) из *_payload. Пачка создается
+        целиком или не создается вовсе; при ошибке возвращает None.
+        """
+        data = [dict(payload, type=self.BULK_TYPES[endpoint]) for endpoint, payload in items]
+        return self.bulk_send(data, len(items))
+    
+    def bulk_send(self, data: Union[list, bytes], count: int) -> Optional[List[str]]:
+        """Отправляет тело items/bulk из count элементов, возвращает их id"""
+        url = f"{self.base_url}/boards/{self.board_id}/items/bulk"
+        try:
+            response = self._request("POST", url, "items/bulk", data)
+        except Exception as e:
+            event_log.error(f"❌ Ошибка пакетного создания: {e}", event="error",
+                            endpoint="items/bulk", count=count)
+            return None
+        if response.status_code != 201:
+            event_log.warning(f"⚠️  API ошибка {response.status_code} для пакета из {count}",
+                              event="api_error", endpoint="items/bulk",
+                              status=response.status_code, count=count)
+            return None
+        try:
+            ids = [item["id"] for item in response.json()["data"]]
+        except (ValueError, KeyError, TypeError):
+            ids = []
+        if len(ids) != count:
+            event_log.warning(f"⚠️  Неожиданный ответ на пакет из {count}",
+                              event="api_error", endpoint="items/bulk", count=count)
+            return None
+        return ids
+    
+    def iter_pages(self, path: str, params: Optional[Dict[str, str]] = None
+                   ) -> Iterator[List[dict]]:
+        """Страницы списка элементов доски по курсору (GET items, connectors)"""
+        cursor = None
+        while True:
+            query = dict(params or {}, limit=self.PAGE_LIMIT)
+            if cursor:
+                query["cursor"] = cursor
+            url = f"{self.base_url}/boards/{self.board_id}/{path}?{urlencode(query)}"
+            response = self._request("GET", url, path)
+            if response.status_code != 200:
+                raise RuntimeError(f"API ошибка {response.status_code} при чтении {path}")
+            body = response.json()
+            yield body.get("data") or []
+            cursor = body.get("cursor")
+            if not cursor:
+                return
+    
+    def update_item(self, endpoint: str, item_id: str, data: dict) -> bool:
+        """Обновляет существующий элемент (PATCH)"""
+        url = f"{self.base_url}/boards/{self.board_id}/{endpoint}/{item_id}"
+        try:
+            response = self._request("PATCH", url, endpoint, data)
+        except Exception as e:
+            event_log.error(f"❌ Ошибка обновления {endpoint}/{item_id}: {e}", event="error",
+                            endpoint=endpoint, id=item_id)
+            return False
+        if response.status_code == 200:
+            return True
+        if response.status_code != 404:
+            event_log.warning(f"⚠️  API ошибка {response.status_code} при обновлении "
+                              f"{endpoint}/{item_id}", event="api_error", endpoint=endpoint,
+                              status=response.status_code, id=item_id)
+        return False
+    
+    def delete_item(self, item_id: str, endpoint: str = "items") -> bool:
+        """Удаляет элемент (связь - endpoint="connectors"); уже удаленный (404) - успех"""
+        url = f"{self.base_url}/boards/{self.board_id}/{endpoint}/{item_id}"
+        try:
+            response = self._request("DELETE", url, endpoint)
+        except Exception as e:
+            event_log.error(f"❌ Ошибка удаления {item_id}: {e}", event="error",
+                            endpoint=endpoint, id=item_id)
+            return False
+        if response.status_code in (204, 404):
+            return True
+        event_log.warning(f"⚠️  API ошибка {response.status_code} при удалении {item_id}",
+                          event="api_error", endpoint=endpoint, status=response.status_code,
+                          id=item_id)
+        return False
+    
+    def frame_payload(self, title: str, x: float, y: float,
+                      width: float, height: float) -> dict:
+        """Тело запроса для рамки"""
+        return {
             "data": {"title": title, "type": "freeform"},
             "style": {"fillColor": "#ffffff"},
             "position": {"x": x, "y": y},
             "geometry": {"width": width, "height": height}
         }
-        return self.api_call("frames", data)
     
-    def create_shape(self, name: str, x: float, y: float,
-                    width: float, height: float, 
-                    color: str = "#4169E1", shape: str = "rectangle") -> Optional[str]:
-        """Создает фигуру"""
-        data = {
+    def shape_payload(self, name: str, x: float, y: float,
+                      width: float, height: float,
+                      color: str = "#4169E1", shape: str = "rectangle",
+                      parent: Parent = None) -> dict:
+        """Тело запроса для фигуры"""
+        return self._attach({
             "data": {"shape": shape, "content": name},
             "style": {
                 "fillColor": color,
@@ -95,31 +364,18 @@ class MiroAPI:
             },
             "position": {"x": x, "y": y},
             "geometry": {"width": width, "height": height}
-        }
-        
-        result = self.api_call("shapes", data)
-        if result:
-            self.elements[name] = result  # Сохраняем для связей
-        return result
+        }, parent)
     
-    def create_sticky(self, text: str, x: float, y: float, 
-                     color: str = "#FFFF99") -> Optional[str]:
-        """Создает стикер"""
-        # Конвертируем HEX цвета в допустимые значения Miro
-        color_map = {
-            "#FFE4E4": "light_pink",
-            "#FFE4CC": "orange", 
-            "#E6F3FF": "light_blue",
-            "#E6FFE6": "light_green",
-            "#E0E0E0": "gray",
-            "#FFFF99": "light_yellow",
-            "#FFFF00": "yellow",
-            "#FFD700": "yellow"
-        }
-        
-        miro_color = color_map.get(color, "light_yellow")
+    def sticky_payload(self, text: str, x: float, y: float,
+                       color: str = "#FFFF99", parent: Parent = None) -> dict:
+        """Тело запроса для стикера"""
+        # Названия Miro передаем как есть, HEX конвертируем в допустимые значения
+        if color in self.STICKY_COLORS:
+            miro_color = color
+        else:
+            miro_color = self.STICKY_HEX.get(color, "light_yellow")
         
-        data = {
+        return self._attach({
             "data": {
                 "content": text,
                 "shape": "square"
@@ -131,29 +387,38 @@ class MiroAPI:
             },
             "position": {"x": x, "y": y},
             "geometry": {"width": 200}
-        }
-        return self.api_call("sticky_notes", data)
+        }, parent)
     
-    def create_text(self, content: str, x: float, y: float, 
-                   size: str = "14") -> Optional[str]:
-        """Создает текст"""
-        data = {
+    def text_payload(self, content: str, x: float, y: float,
+                     size: str = "14", parent: Parent = None) -> dict:
+        """Тело запроса для текста"""
+        return self._attach({
             "data": {"content": content},
             "style": {"fontSize": size, "color": "#000000"},
             "position": {"x": x, "y": y}
-        }
-        return self.api_call("texts", data)
+        }, parent)
     
-    def create_connector(self, start_name: str, end_name: str, 
-                        label: str = "") -> Optional[str]:
-        """Создает связь между элементами"""
-        start_id = self.elements.get(start_name)
-        end_id = self.elements.get(end_name)
-        
-        if not start_id or not end_id:
-            print(f"  ⚠️  Не могу связать '{start_name}' -> '{end_name}'")
-            return None
+    def _attach(self, data: dict, parent: Parent) -> dict:
+        """Кладет элемент в рамку, если она уже создана
         
+        Координаты элемента в рамке отсчитываются от ее левого верхнего угла.
+        """
+        if parent:
+            title, left, top = parent
+            frame_id = self.elements.get(FRAME_PREFIX + title)
+            if frame_id:
+                return self.in_frame(data, frame_id, left, top)
+        return data
+    
+    @staticmethod
+    def in_frame(data: dict, frame_id: str, left: float, top: float) -> dict:
+        """Копия тела запроса для элемента в рамке с углом (left, top)"""
+        position = data["position"]
+        return dict(data, parent={"id": frame_id},
+                    position={"x": position["x"] - left, "y": position["y"] - top})
+    
+    def connector_payload(self, start_id: str, end_id: str, label: str = "") -> dict:
+        """Тело запроса для связи"""
         data = {
             "startItem": {"id": start_id},
             "endItem": {"id": end_id},
@@ -170,5 +435,51 @@ class MiroAPI:
                 "position": 0.5,
                 "textAlignVertical": "middle"
             }]
+        return data
+    
+    def create_frame(self, title: str, x: float, y: float, 
+                    width: float, height: float) -> Optional[str]:
+        """Создает рамку"""
+        result = self.api_call("frames", self.frame_payload(title, x, y, width, height))
+        if result:
+            self.elements[FRAME_PREFIX + title] = result  # Для элементов внутри рамки
+        return result
+    
+    def create_shape(self, name: str, x: float, y: float,
+                    width: float, height: float, 
+                    color: str = "#4169E1", shape: str = "rectangle",
+                    parent: Parent = None) -> Optional[str]:
+        """Создает фигуру"""
+        data = self.shape_payload(name, x, y, width, height, color, shape, parent)
+        result = self.api_call("shapes", data)
+        if result:
+            self.elements[name] = result  # Сохраняем для связей
+        return result
+    
+    def create_sticky(self, text: str, x: float, y: float, 
+                     color: str = "#FFFF99", parent: Parent = None) -> Optional[str]:
+        """Создает стикер"""
+        return self.api_call("sticky_notes", self.sticky_payload(text, x, y, color, parent))
+    
+    def create_text(self, content: str, x: float, y: float, 
+                   size: str = "14", parent: Parent = None) -> Optional[str]:
+        """Создает текст"""
+        return self.api_call("texts", self.text_payload(content, x, y, size, parent))
+    
+    def create_connector(self, start_name: str, end_name: str, 
+                        label: str = "") -> Optional[str]:
+        """Создает связь между элементами"""
+        start_id = self.elements.get(start_name)
+        end_id = self.elements.get(end_name)
+        
+        if not start_id or not end_id:
+            event_log.warning(f"  ⚠️  Не могу связать '{start_name}' -> '{end_name}'",
+                              event="unlinked")
+            return None
         
-        return self.api_call("connectors", data)
+        return self.api_call("connectors", self.connector_payload(start_id, end_id, label))
+
+def _sent(error: Exception) -> bool:
+    """Запрос дошел до сервера: таймаут чтения, а не установки соединения"""
+    return (isinstance(error, requests.exceptions.Timeout) and
+            not isinstance(error, requests.exceptions.ConnectTimeout))
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mock Miro Server - локальная замена Miro API для нагрузочных тестов
+"""
+
+import re
+import json
+import time
+import bisect
+import random
+import argparse
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+
+ITEM_TYPES = {
+    "frames": "frame",
+    "shapes": "shape",
+    "sticky_notes": "sticky_note",
+    "texts": "text",
+    "connectors": "connector",
+}
+
+BULK_LIMIT = 20
+BULK_TYPES = ("shape", "sticky_note", "text")
+
+ITEM_PATH = re.compile(r"^/v2/boards/([^/]+)/([a-z_]+)(?:/([^/?]+))?/?(?:\?.*)?$")
+
+class MockConfig:
+    """Поведение сервера: задержки, ошибки и лимит запросов"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02,
+                 error_rate: float = 0.0, rate_limit: float = 0.0,
+                 retry_after: float = 1.0):
+        self.latency = latency          # средняя задержка ответа, сек
+        self.jitter = jitter            # разброс задержки, сек
+        self.error_rate = error_rate    # доля ответов 503
+        self.rate_limit = rate_limit    # запросов в секунду до 429 (0 - без лимита)
+        self.retry_after = retry_after  # значение Retry-After для 429
+
+class MockMiroServer(ThreadingHTTPServer):
+    """HTTP сервер с эндпоинтами /v2/boards/{id}/frames|shapes|...|items/bulk
+
+    GET /items?type=... и /connectors отдают элементы доски страницами по курсору.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 config: Optional[MockConfig] = None):
+        super().__init__((host, port), _Handler)
+        self.config = config or MockConfig()
+        self.items: Dict[str, Dict] = {}
+        self.boards: Dict[str, List[int]] = {}  # доска -> id элементов по возрастанию
+        self.counters = {"requests": 0, "created": 0, "errors": 0, "throttled": 0}
+        self._next_id = 3458764500000000000
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Адрес для MiroAPI.base_url"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def new_id(self) -> str:
+        with self._lock:
+            self._next_id += 1
+            return str(self._next_id)
+
+    def add_item(self, board_id: str, item_type: str, body: Optional[Dict]) -> Dict:
+        """Сохраняет созданный элемент (вызывать под _lock)"""
+        self._next_id += 1
+        item = dict(body or {}, id=str(self._next_id), type=item_type)
+        self.items[item["id"]] = item
+        self.boards.setdefault(board_id, []).append(self._next_id)
+        self.counters["created"] += 1
+        return item
+
+    def page(self, board_id: str, types: List[str], cursor: Optional[str],
+             limit: int) -> Dict:
+        """Страница элементов доски после курсора (курсор - последний id)"""
+        with self._lock:
+            ids = self.boards.get(board_id, [])
+            start = bisect.bisect_right(ids, int(cursor)) if cursor else 0
+            data = []
+            last = None
+            for item_id in ids[start:]:
+                item = self.items.get(str(item_id))
+                if item is None or item["type"] not in types:
+                    continue
+                data.append(_public(item))
+                last = item_id
+                if len(data) == limit:
+                    break
+            more = last is not None and bisect.bisect_right(ids, last) < len(ids)
+        body = {"data": data, "size": len(data), "limit": limit, "type": "cursor-list"}
+        if more and len(data) == limit:
+            body["cursor"] = str(last)
+        return body
+
+    def throttle(self) -> Optional[Dict[str, str]]:
+        """Считает запрос в окне лимита; возвращает заголовки лимита или None при 429"""
+        limit = self.config.rate_limit
+        with self._lock:
+            self.counters["requests"] += 1
+            if not limit:
+                return {}
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            reset = max(0.0, 1.0 - (now - self._window_start))
+            if self._window_count >= limit:
+                self.counters["throttled"] += 1
+                return None
+            self._window_count += 1
+            return {
+                "X-RateLimit-Limit": str(int(limit)),
+                "X-RateLimit-Remaining": str(int(limit - self._window_count)),
+                "X-RateLimit-Reset": f"{reset:.3f}",
+            }
+
+    def start(self) -> threading.Thread:
+        """Запускает сервер в фоновом потоке"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+class _Handler(BaseHTTPRequestHandler):
+    """Обработчик запросов Miro API"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # заголовки и тело уходят без задержки ACK
+    server: MockMiroServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> Optional[Dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+
+    def _send(self, status: int, body: Optional[Dict] = None,
+              headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _prepare(self):
+        """Общая часть: разбор пути, задержка, лимит и случайные ошибки"""
+        body = self._read_body()
+        match = ITEM_PATH.match(self.path)
+        if not match:
+            self._send(404, {"status": 404, "message": "Not found"})
+            return None
+
+        config = self.server.config
+        if config.latency or config.jitter:
+            time.sleep(max(0.0, random.gauss(config.latency, config.jitter)))
+
+        limit_headers = self.server.throttle()
+        if limit_headers is None:
+            self._send(429, {"status": 429, "message": "Too many requests"},
+                       {"Retry-After": str(config.retry_after)})
+            return None
+        if config.error_rate and random.random() < config.error_rate:
+            with self.server._lock:
+                self.server.counters["errors"] += 1
+            self._send(503, {"status": 503, "message": "Service unavailable"}, limit_headers)
+            return None
+        return match, body, limit_headers
+
+    def do_POST(self):
+        prepared = self._prepare()
+        if not prepared:
+            return
+        match, body, headers = prepared
+        board_id, collection, item_id = match.groups()
+        if collection == "items" and item_id == "bulk":
+            self._bulk_create(board_id, body, headers)
+            return
+        if collection not in ITEM_TYPES or item_id:
+            self._send(404, {"status": 404, "message": "Not found"}, headers)
+            return
+
+        with self.server._lock:
+            item = self.server.add_item(board_id, ITEM_TYPES[collection], body)
+        self._send(201, {"id": item["id"], "type": item["type"]}, headers)
+
+    def _bulk_create(self, board_id: str, body, headers: Dict[str, str]):
+        """POST /items/bulk: до BULK_LIMIT элементов, все или ничего"""
+        if (not isinstance(body, list) or not 0 < len(body) <= BULK_LIMIT or
+                any(not isinstance(item, dict) or item.get("type") not in BULK_TYPES
+                    for item in body)):
+            self._send(400, {"status": 400, "message": "Invalid bulk request"}, headers)
+            return
+        with self.server._lock:
+            created = [self.server.add_item(board_id, data["type"], data) for data in body]
+        self._send(201, {"data": [{"id": item["id"], "type": item["type"]} for item in created],
+                         "type": "bulk-list"}, headers)
+
+    def do_GET(self):
+        prepared = self._prepare()
+        if not prepared:
+            return
+        match, _, headers = prepared
+        board_id, collection, item_id = match.groups()
+        query = parse_qs(urlsplit(self.path).query)
+        if collection == "items" and not item_id:
+            types = query.get("type", [",".join(t for t in ITEM_TYPES.values()
+                                                if t != "connector")])[0].split(",")
+        elif collection == "connectors" and not item_id:
+            types = ["connector"]
+        else:
+            self._send(404, {"status": 404, "message": "Not found"}, headers)
+            return
+        limit = min(50, max(10, int(query.get("limit", ["10"])[0])))
+        cursor = query.get("cursor", [None])[0]
+        self._send(200, self.server.page(board_id, types, cursor, limit), headers)
+
+    def do_PATCH(self):
+        prepared = self._prepare()
+        if not prepared:
+            return
+        match, body, headers = prepared
+        if body is not None and not isinstance(body, dict):
+            self._send(400, {"status": 400, "message": "Invalid request body"}, headers)
+            return
+        with self.server._lock:
+            item = self.server.items.get(match.group(3) or "")
+            if item is not None:
+                item.update(body or {})
+                reply = {"id": item["id"], "type": item["type"]}
+        if item is None:
+            self._send(404, {"status": 404, "message": "Item not found"}, headers)
+            return
+        self._send(200, reply, headers)
+
+    def do_DELETE(self):
+        prepared = self._prepare()
+        if not prepared:
+            return
+        match, _, headers = prepared
+        board_id, _, item_id = match.groups()
+        with self.server._lock:
+            item = self.server.items.pop(item_id or "", None)
+            ids = self.server.boards.get(board_id)
+            if item is not None and ids:
+                index = bisect.bisect_left(ids, int(item["id"]))
+                if index < len(ids) and ids[index] == int(item["id"]):
+                    del ids[index]
+        if item is None:
+            self._send(404, {"status": 404, "message": "Item not found"}, headers)
+            return
+        self._send(204, None, headers)
+
+def _public(item: Dict) -> Dict:
+    """Элемент в виде ответа GET: позиция с точкой отсчета, как в Miro"""
+    item = dict(item)
+    if "position" in item:
+        relative = "parent_top_left" if item.get("parent") else "canvas_center"
+        item["position"] = dict(item["position"], origin="center", relativeTo=relative)
+    return item
+
+def main():
+    """Запуск сервера из командной строки"""
+    parser = argparse.ArgumentParser(description="Локальный mock Miro API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate,
+                        args.rate_limit, args.retry_after)
+    server = MockMiroServer(args.host, args.port, config)
+    print(f"🧪 Mock Miro API: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
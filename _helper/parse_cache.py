@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parse Cache - дисковый кеш распарсенных файлов инструкций
+"""
+
+import os
+import json
+import zlib
+import pickle
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import settings, event_log
+from .instructions import Instruction
+
+# Меняется при изменении формата распарсенных инструкций или тел запросов
+CACHE_VERSION = 9
+
+class ParseCache:
+    """Кеш планов, ключ - путь, mtime, хеш содержимого и входные переменные
+
+    Переменные, заданные SET в предыдущих файлах, влияют на результат
+    подстановки, поэтому тоже входят в ключ. Записи - сжатый pickle,
+    общий размер ограничен, вытесняются давно не использованные.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_file_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes  # крупнее - не кешируются
+        self.max_items = max_file_bytes // 40  # раскрытые FOR/GRID: ~40 байт на строку
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, file_path: str, variables: Dict[str, str], salt: str = "") -> Optional[str]:
+        """Ключ кеша для файла; None, если файл не читается
+
+        salt - настройки, от которых еще зависит результат.
+        """
+        try:
+            stat = os.stat(file_path)
+            with open(file_path, "rb") as f:
+                content_hash = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+        variables_hash = hashlib.sha1(
+            json.dumps(variables, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        raw = f"{CACHE_VERSION}|{file_path}|{stat.st_mtime_ns}|{content_hash}|{variables_hash}|{salt}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Tuple[List[Instruction], Dict[str, str]]]:
+        """Возвращает (записи Instruction, переменные после файла) или None
+
+        Кеш bundles вместо списка инструкций хранит plan_compiler.Bundle.
+        """
+        path = self.directory / f"{key}.bin"
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path)  # отметка использования для LRU
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            path.unlink(missing_ok=True)  # поврежденная запись
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["instructions"], entry["variables"]
+
+    def store(self, key: str, instructions: List[Instruction], variables: Dict[str, str]):
+        """Сохраняет записи Instruction и переменные, вытесняет старые записи"""
+        data = zlib.compress(pickle.dumps(
+            {"instructions": instructions, "variables": variables},
+            protocol=pickle.HIGHEST_PROTOCOL
+        ), 1)
+        path = self.directory / f"{key}.bin"
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            event_log.warning(f"⚠️  Не удалось записать кеш {self.directory}: {e}",
+                              event="cache_error")
+            return
+        self._evict()
+
+    def _evict(self):
+        """Удаляет давно не использованные записи сверх лимита"""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.glob("*.bin"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+def default_cache(name: str = "parse_cache") -> Optional[ParseCache]:
+    """Кеш по настройкам окружения (None, если отключен)
+
+    name - каталог в STATE_DIR: parse_cache для планов, bundles для
+    скомпилированных пакетов.
+    """
+    if not settings.PARSE_CACHE:
+        return None
+    return ParseCache(settings.STATE_DIR / name,
+                      settings.PARSE_CACHE_MAX_MB * 1024 * 1024,
+                      settings.PARSE_CACHE_FILE_MAX_MB * 1024 * 1024)
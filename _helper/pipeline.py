@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline - потоковая передача инструкций от парсера к исполнителю
+"""
+
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+class _Failure:
+    """Исключение из потока-производителя"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def prefetch(source: Iterable[T], maxsize: int = 256) -> Iterator[T]:
+    """Читает источник в фоновом потоке через ограниченную очередь
+
+    Парсинг идет параллельно с отправкой запросов, а очередь не дает
+    парсеру уйти вперед больше чем на maxsize инструкций (backpressure).
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in source:
+                while not stop.is_set():
+                    try:
+                        buffer.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            buffer.put(_DONE)
+        except BaseException as e:
+            buffer.put(_Failure(e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
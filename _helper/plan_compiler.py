@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plan Compiler - заранее сериализованные тела запросов для плана
+"""
+
+import json
+import threading
+from typing import Dict, Iterable, Iterator, List, MutableMapping, NamedTuple, Optional, Tuple
+
+from .miro_api import MiroAPI
+from .command_executor import ITEMS
+from .instructions import FRAME_PREFIX, Instruction
+
+# Заглушки id, которые подставляются при отправке (id известны только на доске)
+PARENT_ID = "\x00parent"
+START_ID = "\x00start"
+END_ID = "\x00end"
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# Заглушки в том виде, в каком они лежат в сериализованном теле
+_PARENT = _dumps(PARENT_ID)
+_START = _dumps(START_ID)
+_END = _dumps(END_ID)
+
+# Начало тела до фрагмента стиля: для одиночного запроса и для items/bulk
+_HEAD = b'{"style":'
+_BULK_HEADS = {endpoint: b'{"type":' + _dumps(item_type) + b',"style":'
+               for endpoint, item_type in MiroAPI.BULK_TYPES.items()}
+
+class WireItem(NamedTuple):
+    """Скомпилированная команда: тело запроса без стиля и ссылки на id"""
+    endpoint: str
+    style: int                      # номер фрагмента в Bundle.styles
+    body: bytes                     # поля после стиля: b',"data":...}'
+    framed: Optional[bytes] = None  # то же в рамке: позиция от ее угла, id - заглушка
+    frame: str = ""                 # ключ рамки в elements
+    start: str = ""                 # концы связи
+    end: str = ""
+
+class Bundle:
+    """Скомпилированный план: команда -> тело запроса в байтах
+
+    Стили одинаковы у тысяч элементов, поэтому каждый сериализуется
+    один раз и хранится общим фрагментом. Id рамок и концов связей
+    зависят от доски - в теле стоят заглушки, которые заменяются при
+    отправке. Один пакет годится для любой доски.
+
+    При потоковой отправке тело собирается в момент отправки и не
+    хранится. План с телами (plan и wire по позициям) держится только
+    для кеша или для плана, который и так целиком в памяти (несколько
+    досок, несколько файлов).
+    """
+
+    def __init__(self):
+        self.styles: List[bytes] = []
+        self.plan: Optional[List[Instruction]] = None  # план для кеша
+        self.wire: Optional[List[Optional[WireItem]]] = None  # тела по позициям plan
+        self._style_index: Dict[Tuple, int] = {}
+        self._compiled: Dict[int, WireItem] = {}  # id(инструкции plan) -> тело
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for name in ("_style_index", "_compiled", "_lock"):
+            del state[name]  # восстанавливаются при загрузке
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._style_index = {}
+        self._lock = threading.Lock()
+        self._compiled = {}
+        if self.plan is not None:
+            self._index()
+
+    def _index(self):
+        """Тела команд plan по их объектам (команды идут к исполнителю те же)"""
+        self._compiled = {id(instruction): item
+                          for instruction, item in zip(self.plan, self.wire) if item}
+
+    def compile(self, api: MiroAPI, instructions: Iterable[Instruction],
+                keep_plan: bool = False, limit: int = 0) -> Iterator[Instruction]:
+        """Отдает инструкции дальше, с keep_plan - компилируя и сохраняя план
+
+        Без keep_plan ничего не копится: тела собираются при отправке.
+        Если план длиннее limit тел (0 - без ограничения), он не
+        сохраняется, остальные команды тоже компилируются при отправке.
+        """
+        if not keep_plan:
+            self.plan = self.wire = None
+            yield from instructions
+            return
+        instructions = iter(instructions)
+        self.plan, self.wire = [], []
+        compiled = 0
+        for instruction in instructions:
+            item = None
+            if instruction.type in ITEMS:
+                if limit and compiled >= limit:
+                    self.plan = self.wire = None
+                    self._compiled = {}
+                    yield instruction
+                    yield from instructions
+                    return
+                item = self._compile(api, instruction)
+                self._compiled[id(instruction)] = item
+                compiled += 1
+            self.plan.append(instruction)
+            self.wire.append(item)
+            yield instruction
+
+    def _compile(self, api: MiroAPI, instruction: Instruction) -> WireItem:
+        if instruction.type == "LINK":
+            data = api.connector_payload(START_ID, END_ID, instruction.label)
+            endpoint, style, body = self._split("connectors", data)
+            return WireItem(endpoint, style, body,
+                            start=instruction.start, end=instruction.end)
+
+        parent = getattr(instruction, "parent", None)
+        if parent:
+            instruction = instruction._replace(parent=None)
+        endpoint, data = ITEMS[instruction.type].payload(api, instruction)
+        endpoint, style, body = self._split(endpoint, data)
+        if not parent:
+            return WireItem(endpoint, style, body)
+        title, left, top = parent
+        framed = self._split(endpoint, MiroAPI.in_frame(data, PARENT_ID, left, top))[2]
+        return WireItem(endpoint, style, body, framed, FRAME_PREFIX + title)
+
+    def _split(self, endpoint: str, data: dict) -> Tuple[str, int, bytes]:
+        """Отделяет стиль (общий фрагмент) от остального тела"""
+        data = dict(data)
+        style = data.pop("style")
+        key = tuple(style.items())
+        index = self._style_index.get(key)
+        if index is None:
+            fragment = _dumps(style)
+            with self._lock:  # тела собираются из потоков отправки
+                try:
+                    index = self.styles.index(fragment)  # после загрузки из кеша
+                except ValueError:
+                    index = len(self.styles)
+                    self.styles.append(fragment)
+                self._style_index[key] = index
+        body = _dumps(data)
+        return endpoint, index, b"," + body[1:] if len(body) > 2 else b"}"
+
+    def get(self, api: MiroAPI, instruction: Instruction) -> Optional[WireItem]:
+        """Тело команды: из сохраненного плана или собранное сейчас (не хранится)"""
+        item = self._compiled.get(id(instruction))
+        if item is None and instruction.type in ITEMS:
+            item = self._compile(api, instruction)
+        return item
+
+    def body(self, item: WireItem, elements: MutableMapping[str, str],
+             head: bytes = _HEAD) -> Optional[bytes]:
+        """Тело запроса для доски: подставляет id рамки и концов связи
+
+        None - если конец связи еще не создан.
+        """
+        rest = item.body
+        if item.start:
+            start_id = elements.get(item.start)
+            end_id = elements.get(item.end)
+            if not start_id or not end_id:
+                return None
+            rest = rest.replace(_START, _dumps(start_id)).replace(_END, _dumps(end_id))
+        elif item.framed is not None:
+            frame_id = elements.get(item.frame)
+            if frame_id:
+                rest = item.framed.replace(_PARENT, _dumps(frame_id))
+        return b"".join((head, self.styles[item.style], rest))
+
+    def bulk_body(self, items: List[WireItem], elements: MutableMapping[str, str]) -> bytes:
+        """Тело запроса items/bulk для пачки фигур, стикеров и текстов"""
+        return b"[" + b",".join(self.body(item, elements, _BULK_HEADS[item.endpoint])
+                                for item in items) + b"]"
+
+    def __len__(self) -> int:
+        return len(self._compiled)
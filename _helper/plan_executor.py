@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plan Executor - параллельное выполнение плана инструкций с учетом зависимостей
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from .command_executor import BULK_COMMANDS, CommandExecutor
+from .instructions import FRAME_PREFIX, Instruction, element_name
+
+# Элемент плана: одна команда или пакет подряд идущих команд из BULK_COMMANDS
+Step = Union[Instruction, List[Instruction]]
+
+class PlanExecutor:
+    """Исполнитель плана на пуле потоков
+
+    FRAME/SHAPE/STICKY/TEXT выполняются параллельно, LINK ждет только
+    фигуры, на которые ссылается, элемент в рамке - создание рамки.
+    PRINT и SLEEP - барьеры: дожидаются всех предыдущих команд и
+    выполняются строго по порядку.
+
+    План читается лениво: одновременно в работе не больше max_pending
+    команд, поэтому генератор инструкций не опережает сеть.
+
+    При batch_size > 1 подряд идущие SHAPE/STICKY/TEXT объединяются в
+    пакеты и создаются одним запросом.
+    """
+
+    BARRIERS = ("PRINT", "SLEEP")
+
+    def __init__(self, executor: CommandExecutor, workers: int = 1,
+                 max_pending: Optional[int] = None, batch_size: int = 1):
+        self.executor = executor
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or self.workers * 4
+        self.batch_size = max(1, batch_size)
+
+    def run(self, instructions: Iterable[Instruction],
+            pool: Optional[ThreadPoolExecutor] = None,
+            executor: Optional[CommandExecutor] = None) -> int:
+        """Выполняет план, возвращает количество успешных команд
+
+        pool - общий пул потоков (несколько планов сразу),
+        executor - исполнитель со своей статистикой вместо общего.
+        """
+        executor = executor or self.executor
+        steps = _batches(instructions, self.batch_size)
+        if self.workers == 1:
+            return sum(_perform(executor, step) for step in steps)
+
+        if pool is None:
+            with ThreadPoolExecutor(max_workers=self.workers) as own_pool:
+                return _PlanRun(own_pool, executor, self.max_pending).run(steps)
+        return _PlanRun(pool, executor, self.max_pending).run(steps)
+
+def _batches(instructions: Iterable[Instruction], size: int) -> Iterator[Step]:
+    """Объединяет подряд идущие команды из BULK_COMMANDS в пакеты до size штук"""
+    if size == 1:
+        yield from instructions
+        return
+
+    batch: List[Instruction] = []
+    for instruction in instructions:
+        if instruction.type in BULK_COMMANDS:
+            batch.append(instruction)
+            if len(batch) == size:
+                yield batch
+                batch = []
+            continue
+        if batch:
+            yield batch if len(batch) > 1 else batch[0]
+            batch = []
+        yield instruction
+    if batch:
+        yield batch if len(batch) > 1 else batch[0]
+
+def _perform(executor: CommandExecutor, step: Step) -> int:
+    """Выполняет шаг плана, возвращает число успешных команд
+
+    Исключение шага считается ошибкой его команд и не прерывает план.
+    """
+    try:
+        if isinstance(step, list):
+            return executor.create_batch(step)
+        return int(executor.execute(step))
+    except Exception as e:
+        for command in step if isinstance(step, list) else [step]:
+            executor._failed(command, e)
+        return 0
+
+class _PlanRun:
+    """Состояние одного выполнения плана"""
+
+    def __init__(self, pool: ThreadPoolExecutor, executor: CommandExecutor,
+                 max_pending: int):
+        self.pool = pool
+        self.executor = executor
+        self.max_pending = max_pending
+        self.success = 0
+        self.outstanding = set()
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def run(self, steps: Iterable[Step]) -> int:
+        writers: Dict[str, Future] = {}        # имя -> последнее создание фигуры
+        readers: Dict[str, List[Future]] = {}  # имя -> связи после создания
+
+        for step in steps:
+            if not isinstance(step, list) and step.type in PlanExecutor.BARRIERS:
+                self.drain()
+                writers.clear()
+                readers.clear()
+                self.success += _perform(self.executor, step)
+                continue
+
+            self.slots.acquire()  # backpressure
+
+            reads, writes = _names(step)
+            # Связь ждет создания своих фигур; повторное имя фигуры ждет
+            # прошлое создание и связи, читающие его id
+            deps = [writers[name] for name in reads if name in writers]
+            for name in writes:
+                deps.extend(readers.pop(name, []))
+                if name in writers:
+                    deps.append(writers[name])
+            future = self.submit_after(deps, step)
+            for name in reads:
+                readers.setdefault(name, []).append(future)
+            for name in writes:
+                writers[name] = future
+
+            self.track(future)
+
+            # Завершенные зависимости больше не нужны - держим память ограниченной
+            if len(writers) + len(readers) > 4 * self.max_pending:
+                _prune(writers, readers)
+
+        self.drain()
+        return self.success
+
+    def track(self, future: Future):
+        """Учитывает команду в работе и освобождает слот по завершении"""
+        with self.lock:
+            self.outstanding.add(future)
+
+        def on_done(f: Future):
+            try:
+                with self.lock:
+                    if not f.cancelled() and f.exception() is None:
+                        self.success += f.result()
+            finally:
+                with self.lock:
+                    self.outstanding.discard(f)
+                    if not self.outstanding:
+                        self.idle.notify_all()
+                self.slots.release()
+
+        future.add_done_callback(on_done)
+
+    def drain(self):
+        """Дожидается всех запущенных команд"""
+        with self.lock:
+            while self.outstanding:
+                self.idle.wait()
+
+    def submit_after(self, deps: List[Future], step: Step) -> Future:
+        """Отправляет шаг в пул после завершения зависимостей"""
+        deps = [dep for dep in dict.fromkeys(deps) if not dep.done()]
+        if not deps:
+            return self.pool.submit(_perform, self.executor, step)
+
+        result: Future = Future()
+        remaining = [len(deps)]
+        lock = threading.Lock()
+
+        def on_dep_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                inner = self.pool.submit(_perform, self.executor, step)
+            except Exception as e:  # пул уже закрыт
+                result.set_exception(e)
+                return
+            inner.add_done_callback(lambda f: _resolve(result, f))
+
+        for dep in deps:
+            dep.add_done_callback(on_dep_done)
+        return result
+
+def _resolve(result: Future, inner: Future):
+    """Переносит результат или исключение inner в result"""
+    error = inner.exception() if not inner.cancelled() else None
+    if inner.cancelled():
+        result.cancel()
+    elif error is not None:
+        result.set_exception(error)
+    else:
+        result.set_result(inner.result())
+
+def _names(step: Step):
+    """Ключи elements, которые шаг читает (связи, рамки-родители) и создает"""
+    reads, writes = [], []
+    for command in step if isinstance(step, list) else (step,):
+        if command.type == "LINK":
+            reads.extend((command.start, command.end))
+            continue
+        if getattr(command, "parent", None):
+            reads.append(FRAME_PREFIX + command.parent[0])
+        name = element_name(command)
+        if name:
+            writes.append(name)
+    return reads, writes
+
+def _prune(writers: Dict[str, Future], readers: Dict[str, List[Future]]):
+    """Убирает завершенные команды из карт зависимостей"""
+    for name in [name for name, future in writers.items() if future.done()]:
+        del writers[name]
+    for name in list(readers):
+        alive = [future for future in readers[name] if not future.done()]
+        if alive:
+            readers[name] = alive
+        else:
+            del readers[name]
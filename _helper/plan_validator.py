@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plan Validator - локальная проверка плана до первого запроса к API
+"""
+
+import re
+import math
+from typing import Container, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .miro_api import MiroAPI
+from .instructions import Instruction
+
+HEX_COLOR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+
+# Частые ошибки в названиях форм -> правильное название Miro
+SHAPE_ALIASES = {"diamond": "rhombus", "callout": "wedge_round_rectangle_callout"}
+
+# Допустимый кегль текста в Miro
+FONT_SIZES = (10, 288)
+
+class Issue(NamedTuple):
+    """Найденная ошибка с местом в файле"""
+    file: str
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.file}:{self.line}: {self.message}" if self.file else self.message
+
+class KnownEverywhere:
+    """Имена, созданные прошлыми запусками на каждой из досок
+
+    При публикации на несколько досок связь на фигуру вне плана
+    допустима, только если фигура есть в реестре всех целевых досок.
+    """
+
+    def __init__(self, registries: Iterable[Container[str]]):
+        self.registries = list(registries)
+
+    def __contains__(self, name: object) -> bool:
+        return bool(self.registries) and all(name in known for known in self.registries)
+
+class PlanValidator:
+    """Проверка плана за один проход
+
+    Собирает ошибки всех выбранных файлов по порядку: цвета, формы, числа,
+    повторные имена и концы связей. Связь на фигуру, объявленную ниже,
+    тоже ошибка - при выполнении ее id еще не будет.
+    """
+
+    def __init__(self, known: Container[str] = ()):
+        self.known = known  # имена, уже созданные прошлыми запусками
+        self.issues: List[Issue] = []
+        self.shapes: Dict[str, Tuple[int, Instruction]] = {}  # имя -> (номер, объявление)
+        self.frames: Dict[str, Tuple[int, Instruction]] = {}
+        self.links: List[Tuple[int, Instruction]] = []
+        self.seen = 0  # сквозной номер инструкции по всем файлам
+
+    def check(self, instructions: Iterable[Instruction]):
+        """Проверяет инструкции очередного файла"""
+        for instruction in instructions:
+            self.seen += 1
+            check = _CHECKS.get(instruction.type)
+            if check:
+                check(self, instruction)
+
+    def add(self, file: str, line: int, message: str):
+        self.issues.append(Issue(file, line, message))
+
+    def finish(self) -> List[Issue]:
+        """Проверяет связи по всем объявленным фигурам, возвращает ошибки по порядку"""
+        for seen, link in self.links:
+            for name in (link.start, link.end):
+                defined = self.shapes.get(name)
+                if defined is None:
+                    if name not in self.known:
+                        self._error(link, f"связь на неизвестную фигуру '{name}'")
+                elif seen < defined[0]:
+                    self._error(link, f"связь на фигуру '{name}' до ее объявления "
+                                      f"({_where(defined[1])})")
+        self.links = []
+        files = {}
+        for issue in self.issues:
+            files.setdefault(issue.file, len(files))
+        self.issues.sort(key=lambda issue: (files[issue.file], issue.line))
+        return self.issues
+
+    def _error(self, instruction: Instruction, message: str):
+        self.add(instruction.file, instruction.line, message)
+
+    def _number(self, instruction: Instruction, field: str, low: float = -math.inf,
+                high: float = math.inf, exclusive_low: bool = False):
+        value = getattr(instruction, field)
+        if value is None:  # auto координата
+            return
+        if not math.isfinite(value):
+            self._error(instruction, f"{field}: недопустимое число {value}")
+        elif value < low or (exclusive_low and value == low) or value > high:
+            limit = f"больше {low:g}" if exclusive_low else f"от {low:g}"
+            if high != math.inf:
+                limit += f" до {high:g}"
+            self._error(instruction, f"{field} = {value:g}, ожидается {limit}")
+
+    def _unique(self, names: Dict[str, Tuple[int, Instruction]], instruction: Instruction,
+                name: str, kind: str):
+        previous = names.get(name)
+        if previous is not None:
+            self._error(instruction, f"{kind} '{name}' уже объявлена ({_where(previous[1])})")
+        else:
+            names[name] = (self.seen, instruction)
+
+def _where(instruction: Instruction) -> str:
+    return f"{instruction.file}:{instruction.line}"
+
+def _check_geometry(validator: PlanValidator, instruction: Instruction):
+    validator._number(instruction, "x")
+    validator._number(instruction, "y")
+    validator._number(instruction, "width", 0, exclusive_low=True)
+    validator._number(instruction, "height", 0, exclusive_low=True)
+
+def _check_frame(validator: PlanValidator, instruction: Instruction):
+    _check_geometry(validator, instruction)
+    validator._unique(validator.frames, instruction, instruction.title, "рамка")
+
+def _check_shape(validator: PlanValidator, instruction: Instruction):
+    _check_geometry(validator, instruction)
+    if not instruction.name:
+        validator._error(instruction, "пустое имя фигуры")
+    validator._unique(validator.shapes, instruction, instruction.name, "фигура")
+    if not HEX_COLOR.match(instruction.color):
+        validator._error(instruction, f"цвет фигуры '{instruction.color}' - нужен HEX #RRGGBB")
+    if instruction.shape not in MiroAPI.SHAPE_TYPES:
+        hint = SHAPE_ALIASES.get(instruction.shape)
+        validator._error(instruction, f"неизвестная форма '{instruction.shape}'" +
+                         (f", используйте {hint}" if hint else ""))
+
+def _check_sticky(validator: PlanValidator, instruction: Instruction):
+    validator._number(instruction, "x")
+    validator._number(instruction, "y")
+    color = instruction.color
+    if color not in MiroAPI.STICKY_COLORS and color not in MiroAPI.STICKY_HEX:
+        validator._error(instruction, f"цвет стикера '{color}' не поддерживается: "
+                                      f"{', '.join(MiroAPI.STICKY_COLORS)}")
+
+def _check_text(validator: PlanValidator, instruction: Instruction):
+    validator._number(instruction, "x")
+    validator._number(instruction, "y")
+    size = _to_float(instruction.size)
+    if size is None or not FONT_SIZES[0] <= size <= FONT_SIZES[1]:
+        validator._error(instruction, f"размер текста '{instruction.size}', "
+                                      f"ожидается {FONT_SIZES[0]}-{FONT_SIZES[1]}")
+
+def _check_link(validator: PlanValidator, instruction: Instruction):
+    if instruction.start == instruction.end:
+        validator._error(instruction, f"связь фигуры '{instruction.start}' с самой собой")
+    validator.links.append((validator.seen, instruction))
+
+def _check_layout(validator: PlanValidator, instruction: Instruction):
+    validator._number(instruction, "x")
+    validator._number(instruction, "y")
+    validator._number(instruction, "gap_x", 0)
+    validator._number(instruction, "gap_y", 0)
+
+def _check_sleep(validator: PlanValidator, instruction: Instruction):
+    validator._number(instruction, "seconds", 0)
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+# Проверки по типу команды
+_CHECKS = {
+    "FRAME": _check_frame,
+    "SHAPE": _check_shape,
+    "STICKY": _check_sticky,
+    "TEXT": _check_text,
+    "LINK": _check_link,
+    "LAYOUT": _check_layout,
+    "SLEEP": _check_sleep,
+}
+
+def print_report(issues: List[Issue], limit: int = 50):
+    """Выводит ошибки проверки"""
+    print(f"\n❌ План не прошел проверку, ошибок: {len(issues)}. Запросы к API не отправлялись.")
+    for issue in issues[:limit]:
+        print(f"  • {issue}")
+    if len(issues) > limit:
+        print(f"  … и еще {len(issues) - limit}")
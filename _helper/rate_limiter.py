@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rate Limiter - планировщик запросов по лимитам Miro API
+"""
+
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+class RateLimiter:
+    """Token bucket, подстраивающийся под заголовки X-RateLimit-*
+
+    Miro считает лимит в кредитах за окно. Стоимость запроса оцениваем
+    по падению X-RateLimit-Remaining между ответами, а скорость выставляем
+    так, чтобы оставшихся кредитов хватило до сброса окна.
+    """
+
+    def __init__(self, rate: float, burst: int = 1,
+                 default_retry_after: float = 1.0):
+        self.max_rate = max(rate, 0.01)
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.default_retry_after = default_retry_after
+        self.paused_until = 0.0
+        self.request_cost = None  # средняя стоимость запроса в кредитах
+        self._last_remaining = None
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Блокирует поток, пока не появится токен"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def _refill(self, now: float):
+        """Пополняет корзину по текущей скорости"""
+        elapsed = now - self._updated
+        if elapsed <= 0:
+            return
+        self._updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def update(self, headers: Mapping[str, str]):
+        """Учитывает остаток лимита из заголовков ответа"""
+        remaining = _to_float(headers.get("X-RateLimit-Remaining"))
+        reset = _to_float(headers.get("X-RateLimit-Reset"))
+        if remaining is None:
+            return
+
+        with self._lock:
+            if self._last_remaining is not None and remaining < self._last_remaining:
+                cost = self._last_remaining - remaining
+                self.request_cost = (cost if self.request_cost is None
+                                     else 0.8 * self.request_cost + 0.2 * cost)
+            self._last_remaining = remaining
+
+            if reset is None:
+                return
+            # Заголовок бывает как unix-временем, так и числом секунд до сброса
+            seconds = reset - time.time() if reset > 1e9 else reset
+            if seconds <= 0:
+                return
+
+            if remaining <= 0:
+                self._pause(seconds)
+                return
+
+            cost = self.request_cost or 1.0
+            budget_rate = remaining / cost / seconds
+            self._refill(time.monotonic())
+            self.rate = max(0.01, min(self.max_rate, budget_rate))
+
+    def retry_after(self, headers: Mapping[str, str]) -> float:
+        """Ставит планировщик на паузу после 429, возвращает паузу в секундах"""
+        delay = _parse_retry_after(headers.get("Retry-After"))
+        if delay is None:
+            delay = self.default_retry_after
+        with self._lock:
+            self._pause(delay)
+        return delay
+
+    def _pause(self, seconds: float):
+        """Останавливает выдачу токенов на заданное время"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self._updated = self.paused_until
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    """Безопасно переводит значение заголовка в число"""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбирает Retry-After: секунды или HTTP-дата"""
+    if not value:
+        return None
+    seconds = _to_float(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
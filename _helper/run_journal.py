@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run Journal - журнал созданных элементов для повторного запуска после сбоя
+"""
+
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .instructions import Instruction, content, element_name
+
+def instruction_digest(instruction: Instruction) -> str:
+    """Хеш содержимого инструкции без служебных полей"""
+    return hashlib.sha1(
+        json.dumps(content(instruction), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+def instruction_key(instruction: Instruction) -> Tuple[str, int, str]:
+    """Ключ инструкции: файл, строка и хеш содержимого"""
+    return instruction.file, instruction.line, instruction_digest(instruction)
+
+# Ключ записи журнала: ключ инструкции и номер ее повтора в запуске
+# (одна строка REPEAT/INCLUDE без переменных дает одинаковые инструкции)
+EntryKey = Tuple[str, int, str, int]
+
+class RunJournal:
+    """Append-only журнал: какая инструкция создала какой элемент Miro
+
+    Запуск считается завершенным, только если все инструкции выполнены
+    успешно. Если прошлый запуск не завершен (сбой или ошибки), при
+    следующем запуске повторяются только невыполненные инструкции.
+
+    Одинаковые инструкции различаются номером повтора: skip() нумерует
+    их в порядке плана, record() берет номер одного из отправленных.
+    Сами копии одинаковы, поэтому порядок создания не важен.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.last_path = self.path.with_suffix(".last" + self.path.suffix)  # прошлый запуск
+        self.done: Dict[EntryKey, Dict] = {}
+        self.failed = False
+        self._seen: Dict[Tuple[str, int, str], int] = {}             # повторов в плане
+        self._pending: Dict[Tuple[str, int, str], List[int]] = {}    # номера отправленных
+        self._recorded: Dict[Tuple[str, int, str], int] = {}         # записано без skip()
+        self._lock = threading.Lock()
+        self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _load(self):
+        """Читает записи незавершенного запуска"""
+        if not self.path.exists():
+            return
+        completed = False
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # оборванная запись после сбоя
+                completed = record.get("event") == "complete"
+                if completed:
+                    self.done.clear()
+                elif "id" in record:
+                    key = (record["file"], record["line"], record["digest"],
+                           record.get("occurrence", 0))
+                    self.done[key] = record
+        if completed:
+            # Прошлый запуск завершен: журнал нужен только для очистки доски
+            self.path.replace(self.last_path)
+        elif self.done:
+            print(f"  ↻ Журнал: найдено {len(self.done)} элементов незавершенного запуска")
+
+    def skip(self, api, instruction: Instruction) -> bool:
+        """Проверяет, создан ли элемент ранее; восстанавливает его id для связей"""
+        if not self.done:
+            return False
+        key = instruction_key(instruction)
+        with self._lock:
+            occurrence = self._seen.get(key, 0)
+            self._seen[key] = occurrence + 1
+            record = self.done.get(key + (occurrence,))
+            if record is None:
+                self._pending.setdefault(key, []).append(occurrence)
+                return False
+        if record.get("name"):
+            api.elements[record["name"]] = record["id"]
+        return True
+
+    def record(self, instruction: Instruction, item_id: str):
+        """Записывает созданный элемент"""
+        key = instruction_key(instruction)
+        file, line, digest = key
+        entry = {"file": file, "line": line, "digest": digest,
+                 "type": instruction.type, "id": item_id}
+        name = element_name(instruction)
+        if name:
+            entry["name"] = name
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending:
+                occurrence = pending.pop(0)
+            else:
+                occurrence = self._recorded.get(key, 0)
+                self._recorded[key] = occurrence + 1
+            if occurrence:
+                entry["occurrence"] = occurrence
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def mark_failed(self):
+        """Отмечает, что в запуске были неудачные инструкции"""
+        self.failed = True
+
+    def complete(self) -> bool:
+        """Закрывает запуск, если все инструкции выполнены"""
+        with self._lock:
+            self._seen.clear()  # следующий запуск нумерует повторы заново
+            self._pending.clear()
+            self._recorded.clear()
+        if self.failed:
+            print("  ↻ Есть невыполненные инструкции - повторный запуск продолжит с них")
+            self.failed = False
+            with self._lock:
+                self._file.flush()
+                self._load()  # созданное в этом запуске тоже пропускается при повторе
+            return False
+        with self._lock:
+            self._file.write(json.dumps({"event": "complete"}) + "\n")
+            self._file.flush()
+            self.done.clear()
+        return True
+
+    def created(self) -> List[Tuple[str, str]]:
+        """(тип, id) элементов текущего и прошлого запуска - для очистки доски"""
+        items = []
+        with self._lock:
+            self._file.flush()
+            for path in (self.last_path, self.path):
+                if not path.exists():
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if "id" in record:
+                            items.append((record.get("type", ""), record["id"]))
+        return items
+
+    def clear(self):
+        """Забывает созданные элементы (после очистки доски)"""
+        with self._lock:
+            self._file.truncate(0)
+            self.last_path.unlink(missing_ok=True)
+            self.done.clear()
+            self._seen.clear()
+            self._pending.clear()
+            self._recorded.clear()
+            self.failed = False
+
+    def close(self):
+        """Закрывает файл журнала"""
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Settings - параметры движка из переменных окружения
+"""
+
+import os
+import sys
+from pathlib import Path
+
+def _env_int(name: str, default: int) -> int:
+    """Читает целое число из окружения"""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    """Читает дробное число из окружения"""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Читает флаг из окружения"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# Каталог с состоянием движка (журналы, кеши)
+STATE_DIR = Path(os.environ.get("MIRO_STATE_DIR", ".miro_state"))
+
+# Адрес Miro API (можно направить на локальный mock сервер)
+BASE_URL = os.environ.get("MIRO_BASE_URL", "https://api.miro.com/v2").rstrip("/")
+
+# Количество параллельных воркеров (1 = последовательное выполнение)
+WORKERS = max(1, _env_int("MIRO_WORKERS", 1))
+
+# HTTP транспорт: размер пула соединений и таймауты (секунды)
+POOL_SIZE = max(1, _env_int("MIRO_POOL_SIZE", WORKERS))
+CONNECT_TIMEOUT = _env_float("MIRO_CONNECT_TIMEOUT", 5.0)
+READ_TIMEOUT = _env_float("MIRO_READ_TIMEOUT", 10.0)
+
+# Адаптивный предел одновременных запросов (AIMD): растет на 1 за круг, пока
+# ошибок нет и задержка не выросла в MIRO_LATENCY_TOLERANCE раз, иначе делится на 2.
+# Воркеры - верхняя граница, предел решает, сколько из них отправляют запросы
+ADAPTIVE_CONCURRENCY = _env_bool("MIRO_ADAPTIVE_CONCURRENCY", True)
+CONCURRENCY_START = max(1, _env_int("MIRO_CONCURRENCY_START", 4))
+CONCURRENCY_MAX = max(1, _env_int("MIRO_CONCURRENCY_MAX", 64))
+LATENCY_TOLERANCE = max(1.0, _env_float("MIRO_LATENCY_TOLERANCE", 2.0))
+
+# Планировщик запросов: скорость (запросов/сек), всплеск и повторы после 429
+RATE_LIMIT = _env_float("MIRO_RATE_LIMIT", 20.0)
+RATE_BURST = max(1, _env_int("MIRO_RATE_BURST", 10))
+RATE_LIMIT_RETRIES = max(0, _env_int("MIRO_RATE_LIMIT_RETRIES", 10))
+RETRY_AFTER_DEFAULT = _env_float("MIRO_RETRY_AFTER_DEFAULT", 2.0)
+
+# Повторы при таймаутах и 5xx: число попыток и экспоненциальная пауза с jitter
+RETRIES = max(0, _env_int("MIRO_RETRIES", 4))
+BACKOFF_BASE = _env_float("MIRO_BACKOFF_BASE", 0.5)
+BACKOFF_MAX = _env_float("MIRO_BACKOFF_MAX", 30.0)
+
+# Журнал созданных элементов для продолжения после сбоя
+JOURNAL = _env_bool("MIRO_JOURNAL", True)
+
+# Постоянный реестр именованных элементов (SQLite)
+REGISTRY = _env_bool("MIRO_REGISTRY", True)
+REGISTRY_BATCH = max(1, _env_int("MIRO_REGISTRY_BATCH", 500))
+
+# Кеш распарсенных файлов инструкций
+PARSE_CACHE = _env_bool("MIRO_PARSE_CACHE", True)
+PARSE_CACHE_MAX_MB = max(1, _env_int("MIRO_PARSE_CACHE_MAX_MB", 64))
+PARSE_CACHE_FILE_MAX_MB = max(1, _env_int("MIRO_PARSE_CACHE_FILE_MAX_MB", 8))
+
+# Потоковая обработка: сколько распарсенных инструкций ждут отправки
+QUEUE_SIZE = max(1, _env_int("MIRO_QUEUE_SIZE", 256))
+
+# Параллельная обработка нескольких файлов: парсинг в процессах, общий пул сети
+PARALLEL_FILES = _env_bool("MIRO_PARALLEL_FILES", False)
+
+# Экспорт метрик запросов (JSON и Prometheus) в конце запуска
+METRICS_DIR = Path(os.environ.get("MIRO_METRICS_DIR", STATE_DIR / "metrics"))
+
+# Учетные данные для неинтерактивного режима (run.py --watch)
+TOKEN = os.environ.get("MIRO_TOKEN", "")
+BOARD_ID = os.environ.get("MIRO_BOARD_ID", "")
+
+# Пауза после последнего изменения файла перед применением, секунды
+WATCH_DEBOUNCE = _env_float("MIRO_WATCH_DEBOUNCE", 0.5)
+
+# Пакетное создание фигур, стикеров и текстов (до 20 в запросе)
+BULK = _env_bool("MIRO_BULK", True)
+BULK_SIZE = min(20, max(1, _env_int("MIRO_BULK_SIZE", 20)))
+
+# Проверка раскладки перед отправкой: пересечения, рамки, привязка к рамкам
+PREFLIGHT = _env_bool("MIRO_PREFLIGHT", True)
+
+# Снимок доски перед каждым запуском: уже существующие элементы не создаются
+SNAPSHOT = _env_bool("MIRO_SNAPSHOT", False)
+
+# Локальная проверка плана перед запуском (цвета, формы, числа, имена, связи)
+VALIDATE = _env_bool("MIRO_VALIDATE", True)
+
+# Компиляция плана в готовые JSON тела запросов (кешируются вместе с планом)
+COMPILE = _env_bool("MIRO_COMPILE", True)
+COMPILE_MAX_ITEMS = max(1, _env_int("MIRO_COMPILE_MAX_ITEMS", 200000))
+
+# Очистка доски: параллельные запросы удаления (скорость держит планировщик)
+RESET_WORKERS = max(1, _env_int("MIRO_RESET_WORKERS", 16))
+
+# Вывод: уровень консоли (debug/verbose - каждый элемент, info, warning, error),
+# JSON lines файл со всеми событиями и обновляемая строка прогресса
+LOG_LEVEL = os.environ.get("MIRO_LOG_LEVEL", "info")
+LOG_JSON = os.environ.get("MIRO_LOG_JSON", "")
+PROGRESS = _env_bool("MIRO_PROGRESS", sys.stdout.isatty())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spatial Index - проверка раскладки перед отправкой: пересечения и рамки
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .instructions import Instruction
+
+# Прямоугольник: левый, верхний, правый, нижний край
+Box = Tuple[float, float, float, float]
+
+# Место элемента для отчета: тип, файл, строка
+Place = Tuple[str, str, int]
+
+# Ширина стикера задается в sticky_payload, высота у квадратного - такая же
+STICKY_SIZE = 200.0
+
+class SpatialGrid:
+    """Равномерная сетка: ячейка -> элементы, задевающие ее
+
+    Поиск соседей смотрит только ячейки прямоугольника, поэтому проверка
+    n элементов стоит O(n) при равномерной плотности, без сравнения всех пар.
+    """
+
+    def __init__(self, cell: float):
+        self.cell = cell
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        self.boxes: List[Box] = []
+
+    def _keys(self, box: Box) -> List[Tuple[int, int]]:
+        cell = self.cell
+        x0, x1 = int(box[0] // cell), int(box[2] // cell)
+        y0, y1 = int(box[1] // cell), int(box[3] // cell)
+        if x0 == x1 and y0 == y1:
+            return [(x0, y0)]
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def insert(self, box: Box) -> int:
+        """Добавляет прямоугольник, возвращает его номер"""
+        return self._insert(box, self._keys(box))
+
+    def add(self, box: Box) -> Set[int]:
+        """Добавляет прямоугольник, возвращает пересекавшие его ранее добавленные"""
+        keys = self._keys(box)
+        found = self._query(box, keys)
+        self._insert(box, keys)
+        return found
+
+    def query(self, box: Box) -> Set[int]:
+        """Номера прямоугольников, пересекающих box (касание краем не считается)"""
+        return self._query(box, self._keys(box))
+
+    def _insert(self, box: Box, keys: List[Tuple[int, int]]) -> int:
+        index = len(self.boxes)
+        self.boxes.append(box)
+        cells = self.cells
+        for key in keys:
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [index]
+            else:
+                bucket.append(index)
+        return index
+
+    def _query(self, box: Box, keys: List[Tuple[int, int]]) -> Set[int]:
+        found = set()
+        boxes = self.boxes
+        left, top, right, bottom = box
+        for key in keys:
+            for index in self.cells.get(key, ()):
+                other = boxes[index]
+                if (other[0] < right and left < other[2] and
+                        other[1] < bottom and top < other[3]):
+                    found.add(index)
+        return found
+
+def item_box(instruction: Instruction) -> Optional[Box]:
+    """Занимаемый элементом прямоугольник (x, y - центр, как в Miro)
+
+    Размер текста оценивается по длине строк и кеглю; текст с нечисловым
+    кеглем не проверяется (None), как и элемент без координат.
+    """
+    cmd_type = instruction.type
+    if cmd_type in ("FRAME", "SHAPE"):
+        width, height = instruction.width, instruction.height
+    elif cmd_type == "STICKY":
+        width = height = STICKY_SIZE
+    elif cmd_type == "TEXT":
+        lines = instruction.content.split("\n")
+        try:
+            size = float(instruction.size)
+        except (TypeError, ValueError):
+            return None
+        width = max(len(line) for line in lines) * size * 0.6
+        height = len(lines) * size * 1.4
+    else:
+        return None
+    if instruction.x is None or instruction.y is None:
+        return None
+    half_w, half_h = width / 2, height / 2
+    return (instruction.x - half_w, instruction.y - half_h,
+            instruction.x + half_w, instruction.y + half_h)
+
+class Preflight:
+    """Проверка плана на лету между парсером и исполнителем
+
+    Элементы сверяются с уже прошедшими: пересечения фигур, стикеров и
+    текстов, выход за рамки. Элемент целиком внутри ранее объявленной
+    рамки получает ее в parent (самую маленькую из подходящих).
+    Хранятся только прямоугольники и места в файле, не сами инструкции;
+    с overlaps=False - только рамки (привязка к parent без отчета).
+    """
+
+    def __init__(self, cell: float = 256.0, frame_cell: float = 4096.0,
+                 max_examples: int = 10, overlaps: bool = True):
+        self.items = SpatialGrid(cell) if overlaps else None
+        self.frames = SpatialGrid(frame_cell)
+        self.item_places: List[Place] = []
+        self.frame_titles: List[str] = []
+        self.max_examples = max_examples
+        self.overlaps = 0
+        self.outside = 0
+        self.attached = 0
+        self.examples: List[str] = []
+
+    def check(self, instructions: Iterable[Instruction]) -> Iterator[Instruction]:
+        """Отдает инструкции дальше, привязывая элементы к рамкам"""
+        for instruction in instructions:
+            box = item_box(instruction)
+            if box is None:
+                yield instruction
+                continue
+            if instruction.type == "FRAME":
+                self.frames.insert(box)
+                self.frame_titles.append(instruction.title)
+                yield instruction
+                continue
+
+            if self.items is not None:
+                for index in self.items.add(box):
+                    self.overlaps += 1
+                    self._example(instruction,
+                                  f"пересекается с {_where(*self.item_places[index])}")
+                self.item_places.append(_place(instruction))
+
+            frame = self._container(box)
+            if frame is not None:
+                self.attached += 1
+                left, top = self.frames.boxes[frame][:2]
+                instruction = instruction._replace(parent=(self.frame_titles[frame], left, top))
+            elif self.frame_titles:
+                self.outside += 1
+                self._example(instruction, "вне рамок")
+            yield instruction
+
+    def _container(self, box: Box) -> Optional[int]:
+        """Номер самой маленькой рамки, целиком содержащей box"""
+        best = None
+        best_area = 0.0
+        for index in self.frames.query(box):
+            frame = self.frames.boxes[index]
+            if (frame[0] <= box[0] and frame[1] <= box[1] and
+                    box[2] <= frame[2] and box[3] <= frame[3]):
+                area = (frame[2] - frame[0]) * (frame[3] - frame[1])
+                if best is None or area < best_area:
+                    best, best_area = index, area
+        return best
+
+    def _example(self, instruction: Instruction, problem: str):
+        if len(self.examples) < self.max_examples:
+            self.examples.append(f"{_where(*_place(instruction))}: {problem}")
+
+    def print_report(self):
+        """Выводит найденные проблемы раскладки"""
+        if self.attached:
+            print(f"  🖼  В рамках: {self.attached}")
+        if not (self.overlaps or self.outside):
+            return
+        print(f"  ⚠️  Пересечений: {self.overlaps}, вне рамок: {self.outside}")
+        for example in self.examples:
+            print(f"    • {example}")
+        hidden = self.overlaps + self.outside - len(self.examples)
+        if hidden > 0:
+            print(f"    … и еще {hidden}")
+
+def _place(instruction: Instruction) -> Place:
+    return instruction.type, instruction.file, instruction.line
+
+def _where(cmd_type: str, file: str, line: int) -> str:
+    """Место инструкции для отчета"""
+    label = f"{cmd_type}"
+    if file:
+        label += f" ({file}:{line})"
+    return label
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sync State - состояние доски для инкрементальной синхронизации
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .run_journal import instruction_digest
+from .instructions import Instruction
+
+# Поле, по которому элемент узнается между версиями файла
+IDENTITY_FIELDS = {
+    "FRAME": ("title",),
+    "SHAPE": ("name",),
+    "STICKY": ("text",),
+    "TEXT": ("content",),
+    "LINK": ("start", "end"),
+}
+
+class SyncState:
+    """Последнее примененное к доске состояние файлов инструкций
+
+    Для каждой инструкции хранит идентичность, хеш содержимого и id
+    элемента в Miro. Записи пишутся по мере применения изменений.
+    """
+
+    def __init__(self, path: Path, board_id: str):
+        self.path = Path(path)
+        self.board_id = board_id
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            " board_id TEXT NOT NULL,"
+            " file TEXT NOT NULL,"
+            " identity TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " item_id TEXT NOT NULL,"
+            " name TEXT,"
+            " PRIMARY KEY (board_id, file, identity)"
+            ") WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def load(self, file: str) -> Dict[str, Tuple[str, str, Optional[str]]]:
+        """Возвращает {identity: (digest, item_id, name)} для файла"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT identity, digest, item_id, name FROM sync_state"
+                " WHERE board_id = ? AND file = ?", (self.board_id, file)
+            ).fetchall()
+        return {identity: (digest, item_id, name)
+                for identity, digest, item_id, name in rows}
+
+    def save(self, file: str, upserts: List[Tuple[str, str, str, Optional[str]]],
+             removed: List[str]):
+        """Применяет изменения состояния файла одной транзакцией"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sync_state"
+                " (board_id, file, identity, digest, item_id, name)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.board_id, file) + row for row in upserts]
+            )
+            self._db.executemany(
+                "DELETE FROM sync_state WHERE board_id = ? AND file = ? AND identity = ?",
+                [(self.board_id, file, identity) for identity in removed]
+            )
+            self._db.commit()
+
+    def item_ids(self) -> List[Tuple[str, str]]:
+        """(тип, id) всех синхронизированных элементов доски"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT identity, item_id FROM sync_state WHERE board_id = ?",
+                (self.board_id,)
+            ).fetchall()
+        return [(identity.split("|", 1)[0], item_id) for identity, item_id in rows]
+
+    def discard_ids(self, item_ids: Iterable[str]):
+        """Забывает элементы, удаленные с доски"""
+        item_ids = set(item_ids)
+        with self._lock:
+            rows = [(self.board_id, file, identity) for file, identity, item_id in
+                    self._db.execute("SELECT file, identity, item_id FROM sync_state"
+                                     " WHERE board_id = ?", (self.board_id,))
+                    if item_id in item_ids]
+            self._db.executemany(
+                "DELETE FROM sync_state WHERE board_id = ? AND file = ? AND identity = ?", rows)
+            self._db.commit()
+
+    def close(self):
+        """Закрывает базу"""
+        with self._lock:
+            self._db.close()
+
+class SyncDiff:
+    """Разница между сохраненным состоянием и новыми инструкциями"""
+
+    def __init__(self, instructions: List[Instruction],
+                 state: Dict[str, Tuple[str, str, Optional[str]]]):
+        self.items: List[Tuple[Instruction, str, str]] = []  # (инструкция, identity, digest)
+        self.creates = 0
+        self.updates = 0
+        self.unchanged = 0
+
+        seen: Dict[str, int] = {}
+        for instruction in instructions:
+            fields = IDENTITY_FIELDS.get(instruction.type)
+            if fields is None:
+                continue
+            base = "|".join([instruction.type] + [str(getattr(instruction, f)) for f in fields])
+            seen[base] = seen.get(base, 0) + 1
+            identity = f"{base}#{seen[base]}"
+            digest = instruction_digest(instruction)
+            self.items.append((instruction, identity, digest))
+
+            previous = state.get(identity)
+            if previous is None:
+                self.creates += 1
+            elif previous[0] != digest:
+                self.updates += 1
+            else:
+                self.unchanged += 1
+
+        identities = {identity for _, identity, _ in self.items}
+        self.deletes = [(identity, item_id, name)
+                        for identity, (_, item_id, name) in state.items()
+                        if identity not in identities]
+
+    def is_empty(self) -> bool:
+        """Нет ни одного изменения"""
+        return not (self.creates or self.updates or self.deletes)
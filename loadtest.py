@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load Test - нагрузочный прогон MiroEngine против локального mock сервера
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List
+
+def generate_instructions(path: Path, items: int, seed: int = 1):
+    """Генерирует файл инструкций: фигуры, стикеры, тексты и связи"""
+    rng = random.Random(seed)
+    shapes = []
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Сгенерировано loadtest.py\n")
+        f.write("SET|color|#4169E1\n")
+        f.write("FRAME|Нагрузка|0|0|20000|20000\n")
+        for i in range(items - 1):
+            x, y = rng.randint(-9000, 9000), rng.randint(-9000, 9000)
+            roll = rng.random()
+            if roll < 0.3 or len(shapes) < 2:
+                name = f"Узел {i}"
+                shapes.append(name)
+                f.write(f"SHAPE|{name}|{x}|{y}|150|80|$color|rectangle\n")
+            elif roll < 0.45:
+                start, end = rng.sample(shapes, 2)
+                f.write(f"LINK|{start}|{end}|\n")
+            elif roll < 0.9:
+                f.write(f"STICKY|Заметка {i}|{x}|{y}|#FFFF99\n")
+            else:
+                f.write(f"TEXT|Текст {i}|{x}|{y}|14\n")
+
+def percentile(values: List[float], share: float) -> float:
+    """Перцентиль по отсортированному списку"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(share * (len(values) - 1))))
+    return values[index]
+
+def run_server(conn, args):
+    """Процесс mock сервера"""
+    from _helper.mock_server import MockConfig, MockMiroServer
+    config = MockConfig(args.latency, args.jitter, args.error_rate,
+                        args.rate_limit, args.retry_after)
+    server = MockMiroServer(port=0, config=config)
+    conn.send(server.base_url)
+    server.serve_forever()
+
+def run_client(queue, args, base_url: str, items: int, workdir: str):
+    """Процесс клиента: прогон одного размера плана"""
+    import resource
+
+    os.environ["MIRO_BASE_URL"] = base_url
+    os.environ["MIRO_STATE_DIR"] = str(Path(workdir) / "state")
+    os.environ.setdefault("MIRO_RATE_LIMIT", str(args.client_rate))
+    os.environ.setdefault("MIRO_BACKOFF_BASE", "0.05")
+
+    from run import MiroEngine
+
+    path = Path(workdir) / f"load_{items}.txt"
+    generate_instructions(path, items)
+
+    engine = MiroEngine("load-test-token", f"load-{items}", workers=args.workers)
+    latencies = []
+    original = engine.api._send
+
+    def timed_send(method, url, endpoint, data):
+        start = time.perf_counter()
+        try:
+            return original(method, url, endpoint, data)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    engine.api._send = timed_send
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        engine.process_file(str(path))
+        engine.complete_run()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    created = sum(engine.executor.get_stats().values())
+    queue.put({
+        "items": items,
+        "requests": len(latencies),
+        "created": created,
+        "seconds": elapsed,
+        "rate": created / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+def benchmark_parser(items: int, workdir: str) -> Dict:
+    """Замер парсера: время и память на инструкцию, без сети и кеша"""
+    import tracemalloc
+    from _helper.instruction_parser import InstructionParser
+
+    path = Path(workdir) / f"parse_{items}.txt"
+    generate_instructions(path, items)
+
+    start = time.perf_counter()
+    count = sum(1 for _ in InstructionParser().iter_file(str(path)))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    plan = InstructionParser().parse_file(str(path))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del plan
+
+    return {"items": count, "seconds": elapsed,
+            "us_per_item": elapsed / count * 1e6 if count else 0.0,
+            "bytes_per_item": size / count if count else 0.0}
+
+def print_parser_report(results: List[Dict]):
+    """Выводит таблицу замеров парсера"""
+    print("\n" + "=" * 60)
+    print("📊 ПАРСЕР")
+    print("-" * 60)
+    print(f"{'инструкций':>10} {'время, с':>10} {'мкс/инстр':>11} {'байт/инстр':>11}")
+    for r in results:
+        print(f"{r['items']:>10} {r['seconds']:>10.3f} {r['us_per_item']:>11.2f} "
+              f"{r['bytes_per_item']:>11.0f}")
+    print("=" * 60)
+
+def print_report(results: List[Dict]):
+    """Выводит таблицу результатов"""
+    print("\n" + "=" * 88)
+    print("📊 НАГРУЗОЧНЫЙ ТЕСТ")
+    print("-" * 88)
+    print(f"{'элементов':>10} {'создано':>9} {'запросов':>9} {'время, с':>9} {'эл/сек':>9} "
+          f"{'p50, мс':>9} {'p99, мс':>9} {'пик, МБ':>9}")
+    for r in results:
+        print(f"{r['items']:>10} {r['created']:>9} {r['requests']:>9} {r['seconds']:>9.2f} "
+              f"{r['rate']:>9.1f} {r['p50']:>9.1f} {r['p99']:>9.1f} {r['peak_mb']:>9.1f}")
+    print("=" * 88)
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Нагрузочный тест Miro Engine")
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000],
+                        help="размеры планов (1k-100k)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка сервера, сек")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="лимит сервера, запросов/сек (0 - без лимита)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--client-rate", type=float, default=100000.0,
+                        help="MIRO_RATE_LIMIT клиента, запросов/сек")
+    parser.add_argument("--parse-only", action="store_true",
+                        help="замерить только парсер, без сервера")
+    args = parser.parse_args()
+
+    if args.parse_only:
+        with tempfile.TemporaryDirectory() as workdir:
+            print_parser_report([benchmark_parser(items, workdir) for items in args.items])
+        return
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=run_server, args=(child_conn, args), daemon=True)
+    server.start()
+    base_url = parent_conn.recv()
+    print(f"🧪 Mock сервер: {base_url}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for items in args.items:
+                print(f"  ▶ {items} элементов...")
+                queue = multiprocessing.Queue()
+                client = multiprocessing.Process(target=run_client,
+                                                 args=(queue, args, base_url, items, workdir))
+                client.start()
+                results.append(queue.get())
+                client.join()
+    finally:
+        server.terminate()
+
+    print_report(results)
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    main()
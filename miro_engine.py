@@ -5,7 +5,6 @@ Miro Engine - главный модуль
 """
 
 import sys
-import time
 import getpass
 from pathlib import Path
 from typing import List
@@ -156,7 +155,6 @@ def main():
     
     for file_path in selected_files:
         engine.process_file(file_path)
-        time.sleep(1)
     
     # Статистика
     engine.executor.print_stats()
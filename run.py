@@ -4,41 +4,499 @@
 Miro Engine - главный модуль
 """
 
+import os
+import sys
+import time
+import argparse
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from _helper.miro_api import MiroAPI
-from _helper.instruction_parser import InstructionParser
+from _helper.instruction_parser import InstructionParser, parse_file_job
 from _helper.command_executor import CommandExecutor
 from _helper.menu_handler import MenuHandler
+from _helper.plan_executor import PlanExecutor
+from _helper.run_journal import RunJournal
+from _helper.element_registry import ElementRegistry
+from _helper.sync_state import SyncState, SyncDiff
+from _helper.parse_cache import default_cache
+from _helper.pipeline import prefetch
+from _helper.auto_layout import apply_layout
+from _helper.instructions import FRAME_PREFIX, Instruction, element_name
+from _helper.spatial_index import Preflight
+from _helper.board_snapshot import load_snapshot
+from _helper.plan_validator import KnownEverywhere, PlanValidator, print_report
+from _helper.plan_compiler import Bundle
+from _helper.board_reset import RESET_TYPES, BulkDeleter, board_targets, parse_types, target
+from _helper.file_watcher import FileWatcher
+from _helper import settings, event_log
 
 class MiroEngine:
     """Основной движок"""
     
-    def __init__(self, token: str, board_id: str):
-        self.api = MiroAPI(token, board_id)
-        self.parser = InstructionParser()
-        self.executor = CommandExecutor(self.api)
+    def __init__(self, token: str, board_id: str, workers: int = settings.WORKERS):
+        event_log.setup()
+        self.registry = (ElementRegistry(settings.STATE_DIR / "elements.sqlite", board_id,
+                                         settings.REGISTRY_BATCH)
+                         if settings.REGISTRY else None)
+        self.api = MiroAPI(token, board_id, pool_size=max(workers, settings.POOL_SIZE),
+                           elements=self.registry)
+        self.parser = InstructionParser(default_cache())
+        self.bundles = default_cache("bundles")
+        self.journal = RunJournal(self.journal_path(board_id)) if settings.JOURNAL else None
+        self.executor = CommandExecutor(self.api, self.journal)
+        self.workers = workers
+        self.plan_executor = PlanExecutor(self.executor, workers,
+                                          batch_size=settings.BULK_SIZE if settings.BULK else 1)
+        self.sync_state = SyncState(settings.STATE_DIR / "sync.sqlite", board_id)
     
     def process_file(self, file_path: str) -> bool:
-        """Обрабатывает один файл инструкций"""
+        """Обрабатывает один файл инструкций
+        
+        Инструкции идут от парсера к исполнителю потоком: первый запрос
+        уходит сразу после первой строки, файл целиком в память не грузится.
+        """
         print(f"\n📄 Обработка файла: {file_path}")
         print("-" * 50)
         
-        # Парсинг инструкций
-        instructions = self.parser.parse_file(file_path)
-        if not instructions:
+        counts = {"total": 0, "skipped": 0}
+        key, bundle = self.cached_bundle(file_path)
+        cached = bundle is not None and bundle.plan is not None
+        if cached:
+            plan = bundle.plan
+            print(f"  📦 Скомпилированный план из кеша: {len(bundle)} запросов")
+            self.preflight_report(file_path, plan)
+        else:
+            # Отчет о раскладке - отдельным проходом до первого запроса: в памяти
+            # только прямоугольники, при выполнении - только рамки для parent
+            if settings.PREFLIGHT:
+                variables = dict(self.parser.variables)
+                self.preflight_report(file_path, apply_layout(self.parser.iter_file(file_path)))
+                self.parser.variables = variables  # SET применятся заново при выполнении
+            plan, _ = self.preflight(apply_layout(self.parser.iter_file(file_path)),
+                                     overlaps=False)
+            if bundle is not None:
+                plan = bundle.compile(self.api, plan, keep_plan=key is not None,
+                                      limit=settings.COMPILE_MAX_ITEMS)
+        
+        def pending():
+            for instruction in prefetch(plan, settings.QUEUE_SIZE):
+                counts["total"] += 1
+                # Пропуск элементов, созданных незавершенным запуском
+                if self.journal and self.journal.skip(self.api, instruction):
+                    counts["skipped"] += 1
+                    continue
+                yield instruction
+        
+        # Выполнение команд (параллельно при workers > 1)
+        self.executor.bundle = bundle
+        try:
+            with event_log.progress(event_log.item_progress(self.api.metrics)):
+                success_count = self.plan_executor.run(pending()) + counts["skipped"]
+        finally:
+            self.executor.bundle = None
+        if self.registry is not None:
+            self.registry.flush()
+        if (key is not None and not cached and bundle.plan is not None and
+                not self.parser.errors and not self.parser.includes):
+            self.bundles.store(key, bundle, self.parser.variables)
+        
+        if not counts["total"]:
             print("  ⚠️  Нет инструкций в файле")
             return False
+        if counts["skipped"]:
+            print(f"  ↻ Уже создано ранее: {counts['skipped']}")
+        print(f"Выполнено: {success_count}/{counts['total']} инструкций")
+        return success_count > 0
+    
+    def process_files(self, file_paths: List[Path]) -> Dict[str, Dict]:
+        """Обрабатывает несколько независимых файлов одновременно
         
-        # Выполнение команд
-        success_count = 0
-        for instruction in instructions:
-            if self.executor.execute(instruction):
-                success_count += 1
+        Файлы парсятся параллельно в процессах, затем все планы идут в общий
+        пул потоков и общий планировщик запросов. Порядок команд внутри
+        файла и статистика по файлам сохраняются. Переменные SET между
+        файлами не передаются - каждый файл видит переменные до начала запуска.
+        """
+        print(f"\n📄 Параллельная обработка файлов: {len(file_paths)}")
+        print("-" * 50)
         
-        print(f"Выполнено: {success_count}/{len(instructions)} инструкций")
-        return success_count > 0
+        start = time.perf_counter()
+        paths = [str(path) for path in file_paths]
+        with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as processes:
+            plans = list(processes.map(parse_file_job, paths,
+                                       [self.parser.variables] * len(paths)))
+        plans = [self.checked_plan(path, plan) for path, plan in zip(paths, plans)]
+        
+        results: Dict[str, Dict] = {}
+        
+        def run_file(path: str, plan: List, pool: ThreadPoolExecutor):
+            file_executor = CommandExecutor(self.api, self.journal, self.executor.snapshot,
+                                            self.compile(plan))
+            skipped = 0
+            pending = []
+            for instruction in plan:
+                if self.journal and self.journal.skip(self.api, instruction):
+                    skipped += 1
+                else:
+                    pending.append(instruction)
+            success = self.plan_executor.run(pending, pool, file_executor) + skipped
+            self.executor.add_stats(file_executor.get_stats(), file_executor.existing)
+            results[path] = {"total": len(plan), "success": success,
+                             "skipped": skipped, "stats": file_executor.get_stats(),
+                             "seconds": time.perf_counter() - start}
+        
+        with event_log.progress(event_log.item_progress(self.api.metrics)), \
+             ThreadPoolExecutor(max_workers=self.workers) as pool, \
+             ThreadPoolExecutor(max_workers=len(paths)) as files:
+            for future in [files.submit(run_file, path, plan, pool)
+                           for path, plan in zip(paths, plans)]:
+                future.result()
+        
+        if self.registry is not None:
+            self.registry.flush()
+        
+        for path in paths:
+            result = results[path]
+            created = ", ".join(f"{k}: {v}" for k, v in result["stats"].items() if v)
+            print(f"  📄 {path}: {result['success']}/{result['total']} "
+                  f"за {result['seconds']:.1f} сек" + (f" ({created})" if created else ""))
+        print(f"Общее время: {time.perf_counter() - start:.1f} сек")
+        return results
+    
+    def fan_out(self, file_paths: List[Path], board_ids: List[str]) -> Dict[str, Dict]:
+        """Применяет одни и те же файлы к нескольким доскам одновременно
+        
+        План парсится один раз. У каждой доски свой реестр элементов и
+        журнал, а пул соединений и планировщик запросов общие.
+        """
+        print(f"\n📤 Публикация на доски: {len(board_ids)}")
+        print("-" * 50)
+        
+        plans = [(str(path), self.checked_plan(str(path),
+                                               apply_layout(self.parser.iter_file(str(path)))))
+                 for path in file_paths]
+        total = sum(len(plan) for _, plan in plans)
+        # Тела запросов общие для всех досок, id подставляются при отправке
+        bundle = self.compile(instruction for _, plan in plans for instruction in plan)
+        results: Dict[str, Dict] = {}
+        
+        def run_board(board_id: str, pool: ThreadPoolExecutor):
+            start = time.perf_counter()
+            # Текущая доска - через открытые реестр и журнал: второй писатель
+            # в тот же jsonl и SQLite не нужен
+            current = board_id == self.api.board_id
+            if current:
+                api, registry, journal = self.api, self.registry, self.journal
+            else:
+                registry = (ElementRegistry(settings.STATE_DIR / "elements.sqlite", board_id,
+                                            settings.REGISTRY_BATCH)
+                            if settings.REGISTRY else None)
+                api = MiroAPI(self.api.token, board_id, elements=registry,
+                              session=self.api.session, limiter=self.api.limiter,
+                              concurrency=self.api.concurrency,
+                              metrics=self.api.metrics)
+                journal = RunJournal(self.journal_path(board_id)) if settings.JOURNAL else None
+            executor = CommandExecutor(api, journal, bundle=bundle)
+            
+            success = 0
+            for _, plan in plans:
+                pending = [instruction for instruction in plan
+                           if not (journal and journal.skip(api, instruction))]
+                success += self.plan_executor.run(pending, pool, executor)
+                success += len(plan) - len(pending)
+            
+            if journal:
+                journal.complete()
+            if current:
+                if registry is not None:
+                    registry.flush()
+                self.executor.snapshot = None  # снимок устарел: на доске новые элементы
+            else:
+                if journal:
+                    journal.close()
+                if registry is not None:
+                    registry.close()
+            results[board_id] = {"total": total, "success": success,
+                                 "stats": executor.get_stats(),
+                                 "seconds": time.perf_counter() - start}
+        
+        with event_log.progress(event_log.item_progress(self.api.metrics)), \
+             ThreadPoolExecutor(max_workers=self.workers) as pool, \
+             ThreadPoolExecutor(max_workers=len(board_ids)) as boards:
+            for future in [boards.submit(run_board, board_id, pool) for board_id in board_ids]:
+                future.result()
+        
+        print("\n" + "=" * 50)
+        print("📊 ИТОГИ ПО ДОСКАМ:")
+        print("-" * 50)
+        for board_id in board_ids:
+            result = results[board_id]
+            mark = "✅" if result["success"] == result["total"] else "⚠️ "
+            print(f"  {mark} {board_id}: {result['success']}/{result['total']} "
+                  f"за {result['seconds']:.1f} сек, создано {sum(result['stats'].values())}")
+        print("=" * 50)
+        self.api.metrics.print_summary()
+        self.export_metrics()
+        return results
+    
+    def sync_file(self, file_path: str) -> bool:
+        """Синхронизирует файл: отправляет только изменения с прошлого применения"""
+        print(f"\n🔄 Синхронизация файла: {file_path}")
+        print("-" * 50)
+        
+        instructions = self.checked_plan(file_path,
+                                         apply_layout(self.parser.iter_file(file_path)))
+        file_key = str(file_path)
+        state = self.sync_state.load(file_key)
+        diff = SyncDiff(instructions, state)
+        print(f"  Новых: {diff.creates}, изменено: {diff.updates}, "
+              f"удалено: {len(diff.deletes)}, без изменений: {diff.unchanged}")
+        if diff.is_empty():
+            for identity, (_, item_id, name) in state.items():
+                if name:
+                    self._remember(name, item_id)
+            return True
+        
+        upserts = []
+        removed = []
+        failed = 0
+        
+        # Удаляем элементы, исчезнувшие из файла
+        for identity, item_id, name in diff.deletes:
+            endpoint, _ = target(identity.split("|", 1)[0], item_id)
+            if self.api.delete_item(item_id, endpoint):
+                removed.append(identity)
+                if name:
+                    self.api.elements.pop(name, None)
+                event_log.debug(f"  ✗ Удалено: {identity}", event="deleted", id=item_id)
+            else:
+                failed += 1
+        
+        # Создаем и обновляем в порядке файла, чтобы связи видели свежие id
+        recreated = set()
+        for instruction, identity, digest in diff.items:
+            cmd_type = instruction.type
+            name = element_name(instruction)
+            previous = state.get(identity)
+            endpoints_moved = (cmd_type == "LINK" and
+                               (instruction.start in recreated or
+                                instruction.end in recreated))
+            parent = getattr(instruction, "parent", None)
+            parent_moved = bool(parent) and FRAME_PREFIX + parent[0] in recreated
+            
+            if previous and previous[0] == digest and not (endpoints_moved or parent_moved):
+                if name:
+                    self._remember(name, previous[1])
+                continue
+            
+            item_id = None
+            if previous and self.executor.update(instruction, previous[1]):
+                item_id = previous[1]
+                if name:
+                    self._remember(name, item_id)
+            else:
+                item_id = self.executor.create(instruction)
+                if name and item_id:
+                    recreated.add(name)
+            
+            if item_id:
+                upserts.append((identity, digest, item_id, name))
+            else:
+                failed += 1
+        
+        self.sync_state.save(file_key, upserts, removed)
+        if self.registry is not None:
+            self.registry.flush()
+        
+        print(f"Применено изменений: {len(upserts) + len(removed)}, ошибок: {failed}")
+        return failed == 0
+    
+    def _remember(self, name: str, item_id: str):
+        """Записывает имя в реестр, только если id изменился (без лишней записи в SQLite)"""
+        if self.api.elements.get(name) != item_id:
+            self.api.elements[name] = item_id
+    
+    def reset(self, types: Optional[Sequence[str]] = None, passes: int = 3) -> bool:
+        """Очищает доску: созданное движком (types=None) или все элементы типов
+        
+        Созданное берется из журнала запусков, реестра элементов и состояния
+        синхронизации. Элементы доски читаются постранично и удаляются по
+        мере чтения; проход повторяется, пока что-то удаляется.
+        """
+        start = time.perf_counter()
+        api = MiroAPI(self.api.token, self.api.board_id, pool_size=settings.RESET_WORKERS,
+                      limiter=self.api.limiter, concurrency=self.api.concurrency,
+                      metrics=self.api.metrics)
+        deleter = BulkDeleter(api, settings.RESET_WORKERS)
+        try:
+            if types is None:
+                created = list(self.journal.created()) if self.journal else []
+                if self.registry is not None:
+                    created += [("", item_id) for item_id in self.registry.item_ids()]
+                else:
+                    created += [("", item_id) for item_id in self.api.elements.values()]
+                created += self.sync_state.item_ids()
+                # Связи первыми: удаление фигуры удаляет и ее связи
+                targets = {}
+                for item_type, item_id in sorted(created, key=lambda item: item[0] != "LINK"):
+                    targets.setdefault(item_id, target(item_type, item_id))
+                print(f"\n🧹 Очистка созданного движком: {len(targets)} элементов")
+                deleter.run(targets.values(), len(targets))
+            else:
+                print(f"\n🧹 Очистка доски: {', '.join(types)}")
+                for _ in range(passes):
+                    if not deleter.run(board_targets(api, types)):
+                        break
+        finally:
+            api.close()
+        
+        self.forget(deleter.deleted,
+                    everything=not deleter.failed and (types is None or
+                                                       set(RESET_TYPES) <= set(types)))
+        print(f"  Удалено {len(deleter.deleted)} за {time.perf_counter() - start:.1f} сек"
+              + (f", не удалось: {len(deleter.failed)}" if deleter.failed else ""))
+        return not deleter.failed
+    
+    def forget(self, item_ids: List[str], everything: bool = False):
+        """Убирает удаленные элементы из реестра, синхронизации и журнала"""
+        if self.registry is not None:
+            self.registry.discard_ids(item_ids)
+        else:
+            deleted = set(item_ids)
+            for name in [name for name, item_id in self.api.elements.items()
+                         if item_id in deleted]:
+                del self.api.elements[name]
+        self.sync_state.discard_ids(item_ids)
+        if everything and self.journal:
+            self.journal.clear()
+        self.executor.snapshot = None
+    
+    def validate(self, file_paths: List[Path], board_ids: Optional[List[str]] = None) -> bool:
+        """Проверяет выбранные файлы локально; при ошибках запуск не начинается
+        
+        board_ids - целевые доски публикации: связи вне плана ищутся в
+        реестрах этих досок, а не текущей.
+        """
+        if not settings.VALIDATE:
+            return True
+        registries = []
+        if board_ids is None:
+            known = self.api.elements
+        else:
+            for board_id in board_ids:
+                if board_id == self.api.board_id:
+                    registries.append(self.api.elements)
+                elif settings.REGISTRY:
+                    registries.append(ElementRegistry(settings.STATE_DIR / "elements.sqlite",
+                                                      board_id, settings.REGISTRY_BATCH))
+                else:
+                    registries.append({})  # без реестра имена досок неизвестны
+            known = KnownEverywhere(registries)
+        variables = dict(self.parser.variables)
+        validator = PlanValidator(known=known)
+        try:
+            for path in file_paths:
+                validator.check(self.parser.iter_file(str(path)))
+                for file, line, message in self.parser.errors:
+                    validator.add(file, line, message)
+            issues = validator.finish()
+        finally:
+            self.parser.variables = variables  # SET применятся заново при выполнении
+            for registry in registries:
+                if isinstance(registry, ElementRegistry) and registry is not self.api.elements:
+                    registry.close()
+        if issues:
+            print_report(issues)
+            return False
+        return True
+    
+    def snapshot(self):
+        """Читает элементы доски: следующий запуск пропустит уже существующие"""
+        print("\n📸 Снимок доски...")
+        start = time.perf_counter()
+        try:
+            snapshot = load_snapshot(self.api)
+        except Exception as e:
+            print(f"❌ Не удалось прочитать доску: {e}")
+            return None
+        counts = ", ".join(f"{kind}: {count}" for kind, count in sorted(snapshot.counts.items()))
+        print(f"  Элементов: {len(snapshot)} за {time.perf_counter() - start:.1f} сек"
+              + (f" ({counts})" if counts else ""))
+        self.executor.snapshot = snapshot
+        return snapshot
+    
+    def preflight(self, instructions: Iterable[Instruction], overlaps: bool = True
+                  ) -> Tuple[Iterable[Instruction], Optional[Preflight]]:
+        """Подключает проверку раскладки к потоку инструкций (если включена)
+        
+        overlaps=False - только привязка к рамкам, без индекса всех элементов.
+        """
+        if not settings.PREFLIGHT:
+            return instructions, None
+        check = Preflight(overlaps=overlaps)
+        return check.check(instructions), check
+    
+    def cached_bundle(self, file_path: str) -> Tuple[Optional[str], Optional[Bundle]]:
+        """Ключ кеша и пакет для файла: из кеша или пустой для компиляции на лету
+        
+        Ключ None - пакет не сохраняется (кеш отключен или файл крупнее лимита).
+        """
+        if not settings.COMPILE:
+            return None, None
+        key = None
+        if self.bundles is not None:
+            key = self.bundles.key(str(file_path), self.parser.variables,
+                                   salt=f"preflight={settings.PREFLIGHT}")
+        if key is not None:
+            cached = self.bundles.load(key)
+            if cached is not None:
+                bundle, self.parser.variables = cached
+                return key, bundle
+            if os.path.getsize(file_path) > self.bundles.max_file_bytes:
+                key = None
+        return key, Bundle()
+    
+    def compile(self, instructions: Iterable[Instruction]) -> Optional[Bundle]:
+        """Компилирует готовый план в тела запросов (если включено)"""
+        if not settings.COMPILE:
+            return None
+        bundle = Bundle()
+        for _ in bundle.compile(self.api, instructions, keep_plan=True):
+            pass
+        return bundle
+    
+    def checked_plan(self, file_path: str, instructions: Iterable[Instruction]
+                     ) -> List[Instruction]:
+        """Проверяет план файла целиком и выводит отчет"""
+        plan, check = self.preflight(instructions)
+        plan = list(plan)
+        _print_preflight(file_path, check)
+        return plan
+    
+    def preflight_report(self, file_path: str, instructions: Iterable[Instruction]):
+        """Проверяет раскладку без сохранения плана и выводит отчет"""
+        plan, check = self.preflight(instructions)
+        for _ in plan:
+            pass
+        _print_preflight(file_path, check)
+    
+    def complete_run(self):
+        """Завершает запуск: закрывает журнал, если все выполнено, и выгружает метрики"""
+        if self.journal:
+            self.journal.complete()
+        self.export_metrics()
+    
+    def export_metrics(self):
+        """Сохраняет метрики запросов в JSON и формате Prometheus"""
+        json_path, prom_path = self.api.metrics.export(settings.METRICS_DIR)
+        print(f"  📈 Метрики: {json_path}, {prom_path}")
+    
+    @staticmethod
+    def journal_path(board_id: str) -> Path:
+        """Путь к журналу запусков для доски"""
+        safe_id = "".join(c if c.isalnum() or c in "-_=" else "_" for c in board_id)
+        return settings.STATE_DIR / f"journal_{safe_id}.jsonl"
     
     def find_instruction_files(self) -> List[Path]:
         """Находит все файлы инструкций"""
@@ -53,9 +511,90 @@ class MiroEngine:
         files.extend(sorted(Path(".").glob("*_instructions.txt")))
         
         return files
+    
+    def is_instruction_file(self, file_path: Path) -> bool:
+        """Попадает ли файл под правила find_instruction_files"""
+        file_path = Path(file_path).resolve()
+        if file_path.parent == Path("instructions").resolve():
+            return file_path.suffix == ".txt"
+        if file_path.parent == Path(".").resolve():
+            return file_path.name.endswith("_instructions.txt")
+        return False
+    
+    def watch(self, debounce: float = settings.WATCH_DEBOUNCE):
+        """Синхронизирует все файлы, затем применяет только измененные"""
+        def apply(file_path: Path):
+            started = time.time()
+            relative = os.path.relpath(file_path)
+            if not self.validate([Path(relative)]):
+                return
+            self.sync_file(relative)
+            print(f"  ⏱ {relative}: {time.time() - started:.1f} сек")
+        
+        directories = [Path(".")]
+        if Path("instructions").is_dir():
+            directories.append(Path("instructions"))
+        watcher = FileWatcher(directories, self.is_instruction_file, apply, debounce)
+        
+        files = self.find_instruction_files()
+        if self.validate(files):
+            for file_path in files:
+                self.sync_file(str(file_path))
+        print(f"\n👀 Наблюдение за {', '.join(str(d) for d in directories)} "
+              f"(Ctrl+C для выхода)")
+        watcher.run()
+        self.export_metrics()
+
+def _print_preflight(file_path: str, check: Optional[Preflight]):
+    """Отчет проверки раскладки, если есть пересечения или выход за рамки"""
+    if check and (check.overlaps or check.outside):
+        print(f"  📐 {file_path}:")
+        check.print_report()
+
+def watch():
+    """Неинтерактивный режим: учетные данные из MIRO_TOKEN и MIRO_BOARD_ID"""
+    if not settings.TOKEN or not settings.BOARD_ID:
+        print("❌ Для --watch задайте переменные окружения MIRO_TOKEN и MIRO_BOARD_ID")
+        sys.exit(1)
+    try:
+        MiroEngine(settings.TOKEN, settings.BOARD_ID).watch()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+def reset(mode: str):
+    """Неинтерактивная очистка доски: created, all или типы через запятую"""
+    if not settings.TOKEN or not settings.BOARD_ID:
+        print("❌ Для --reset задайте переменные окружения MIRO_TOKEN и MIRO_BOARD_ID")
+        sys.exit(1)
+    types = parse_types(mode)
+    if types == []:
+        sys.exit(1)
+    engine = MiroEngine(settings.TOKEN, settings.BOARD_ID)
+    ok = engine.reset(types)
+    engine.export_metrics()
+    sys.exit(0 if ok else 1)
 
 def main():
     """Главная функция с жизненным циклом"""
+    parser = argparse.ArgumentParser(description="Miro Engine")
+    parser.add_argument("--watch", action="store_true",
+                        help="без меню: применять изменения файлов инструкций на лету")
+    parser.add_argument("--reset", nargs="?", const="created", metavar="ТИПЫ",
+                        help="без меню: удалить созданное движком (created), все элементы "
+                             f"(all) или элементы типов через запятую: {','.join(RESET_TYPES)}")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="выводить каждый созданный элемент (MIRO_LOG_LEVEL=debug)")
+    args = parser.parse_args()
+    if args.verbose:
+        event_log.setup("debug")
+    if args.watch:
+        watch()
+        return
+    if args.reset:
+        reset(args.reset)
+        return
+    
     print("\n" + "="*60)
     print("   🚀 MIRO ENGINE - UNIVERSAL DIAGRAM BUILDER")
     print("="*60)
@@ -77,19 +616,31 @@ def main():
             menu.process_instructions(engine, board_id)
             
         elif choice == "2":
+            menu.process_instructions(engine, board_id, sync=True)
+            
+        elif choice == "3":
+            menu.fan_out(engine)
+            
+        elif choice == "4":
+            engine.snapshot()
+            
+        elif choice == "5":
+            menu.reset_board(engine, board_id)
+            
+        elif choice == "6":
             menu.show_files(engine)
                 
-        elif choice == "3":
+        elif choice == "7":
             result = menu.change_token(MiroEngine, board_id)
             if result[0]:  # Если токен изменен
                 token, engine = result
                 
-        elif choice == "4":
+        elif choice == "8":
             result = menu.change_board(MiroEngine, token, board_id)
             if result[0]:  # Если доска изменена
                 board_id, engine = result
                 
-        elif choice == "5":
+        elif choice == "9":
             print("\n👋 До свидания!")
             break
             
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Адаптивный предел запросов (AIMD): рост при полной загрузке и спад при перегрузке
+
+Запуск: python -m unittest discover -s tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from _helper.concurrency_limiter import ConcurrencyLimiter
+
+def saturated(limiter: ConcurrencyLimiter, responses: int, seconds: float = 0.1):
+    """Держит предел выбранным: каждый ответ сразу сменяется новым запросом"""
+    slots = []
+    for _ in range(responses):
+        while limiter.in_flight < limiter.limit:
+            slots.append(limiter.acquire())
+        limiter.release(slots.pop(0), "shapes", seconds)
+    for started in slots:
+        limiter.release(started, "shapes", seconds)
+
+class ConcurrencyLimiterTest(unittest.TestCase):
+
+    def test_grows_about_one_per_round_when_saturated(self):
+        limiter = ConcurrencyLimiter(start=4, maximum=64)
+        saturated(limiter, 4 + 5 + 6 + 7)  # четыре круга: 4 -> 8
+        self.assertIn(limiter.limit, (7, 8, 9))
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_does_not_grow_below_the_limit(self):
+        limiter = ConcurrencyLimiter(start=4, maximum=64)
+        for _ in range(100):
+            limiter.release(limiter.acquire(), "shapes", 0.1)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_never_exceeds_maximum(self):
+        limiter = ConcurrencyLimiter(start=4, maximum=6)
+        saturated(limiter, 200)
+        self.assertEqual(limiter.limit, 6)
+
+    def test_overload_halves_once_per_round(self):
+        limiter = ConcurrencyLimiter(start=16, maximum=64)
+        slots = [limiter.acquire() for _ in range(8)]
+        for started in slots:
+            limiter.release(started, "shapes", None, overloaded=True)
+        self.assertEqual(limiter.limit, 8)  # ответы запросов, ушедших до спада, его не повторяют
+
+        limiter.release(limiter.acquire(), "shapes", None, overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_does_not_fall_below_minimum(self):
+        limiter = ConcurrencyLimiter(start=2, maximum=8, minimum=2)
+        for _ in range(5):
+            limiter.release(limiter.acquire(), "shapes", None, overloaded=True)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_latency_growth_decreases_per_endpoint(self):
+        limiter = ConcurrencyLimiter(start=8, maximum=64, tolerance=2.0)
+        for _ in range(20):
+            limiter.release(limiter.acquire(), "items/bulk", 1.0)
+            limiter.release(limiter.acquire(), "shapes", 0.1)
+        self.assertEqual(limiter.limit, 8)  # медленный эндпоинт сам по себе не перегрузка
+
+        for _ in range(10):
+            limiter.release(limiter.acquire(), "shapes", 1.0)
+        self.assertLess(limiter.limit, 8)
+
+if __name__ == "__main__":
+    unittest.main()
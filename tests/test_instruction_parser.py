@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Арифметика в фигурных скобках: только числовые поля
+
+Запуск: python -m unittest discover -s tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from _helper.instruction_parser import InstructionParser
+
+def parse(line: str, variables=None):
+    parser = InstructionParser()
+    parser.variables = dict(variables or {})
+    return parser.parse_line(line, "test.txt", 1)
+
+class BracesTest(unittest.TestCase):
+
+    def test_braces_in_sticky_text_are_kept(self):
+        sticky = parse("STICKY|Release {2024}|0|0|yellow")
+        self.assertEqual(sticky.text, "Release {2024}")
+
+    def test_division_by_zero_in_text_is_not_an_error(self):
+        text = parse("TEXT|ratio {1/0}|0|0|14")
+        self.assertEqual(text.content, "ratio {1/0}")
+
+    def test_braces_in_names_and_labels_are_kept(self):
+        self.assertEqual(parse("SHAPE|Node {1+1}|0|0|100|100").name, "Node {1+1}")
+        self.assertEqual(parse("LINK|A|B|{2*3} calls").label, "{2*3} calls")
+
+    def test_numeric_fields_are_evaluated(self):
+        shape = parse("SHAPE|A|{$i*220+100}|{10/4}|{50*2}|80", {"i": "2"})
+        self.assertEqual((shape.x, shape.y, shape.width, shape.height), (540, 2.5, 100, 80))
+        self.assertEqual(parse("TEXT|t|0|0|{12+2}").size, "14")
+
+    def test_error_in_numeric_field_is_reported(self):
+        with self.assertRaises(ValueError):
+            parse("STICKY|s|{1/0}|0")
+
+    def test_set_evaluates_only_whole_expression(self):
+        parser = InstructionParser()
+        parser.variables = {"x": "100"}
+        parser.parse_line("SET|next|{$x + 200}")
+        parser.parse_line("SET|title|Sprint {2024}")
+        self.assertEqual(parser.variables["next"], "300")
+        self.assertEqual(parser.variables["title"], "Sprint {2024}")
+
+    def test_blocks_evaluate_numeric_fields_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "plan.txt"
+            path.write_text("FOR|i|1|{1+1}\n"
+                            "STICKY|Note {$i}|{$i*100}|0\n"
+                            "END\n", encoding="utf-8")
+            stickies = list(InstructionParser().iter_file(str(path)))
+        self.assertEqual([(s.text, s.x) for s in stickies],
+                         [("Note {1}", 100), ("Note {2}", 200)])
+
+class VariablesTest(unittest.TestCase):
+
+    def test_prefix_names_are_not_confused(self):
+        variables = {"col": "3", "color": "red", "c": "X"}
+        sticky = parse("STICKY|$color/$col/$c|{$col*100}|0", variables)
+        self.assertEqual((sticky.text, sticky.x), ("red/3/X", 300))
+
+    def test_result_does_not_depend_on_definition_order(self):
+        forward = parse("STICKY|$col $color|0|0", {"col": "1", "color": "blue"})
+        backward = parse("STICKY|$col $color|0|0", {"color": "blue", "col": "1"})
+        self.assertEqual(forward.text, "1 blue")
+        self.assertEqual(backward.text, forward.text)
+
+    def test_single_pass_and_unknown_references(self):
+        sticky = parse("STICKY|$a $colour|0|0", {"a": "$b", "b": "never", "col": "1"})
+        self.assertEqual(sticky.text, "$b $colour")  # значение не подставляется повторно
+
+if __name__ == "__main__":
+    unittest.main()
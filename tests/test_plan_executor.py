@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Параллельный исполнитель плана: барьеры, зависимости связей и статистика
+
+Запуск: python -m unittest discover -s tests
+"""
+
+import sys
+import time
+import logging
+import random
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from _helper.command_executor import ITEMS, CommandExecutor
+from _helper.instructions import Link, Print, Shape, Sticky
+from _helper.miro_api import MiroAPI
+from _helper.plan_executor import PlanExecutor
+
+logging.getLogger("miro").addHandler(logging.NullHandler())  # ожидаемые ошибки не печатаются
+
+class RecordingExecutor(CommandExecutor):
+    """Исполнитель без сети: создание - случайная пауза и запись в лог"""
+
+    def __init__(self, fail=()):
+        super().__init__(MiroAPI("token", "board"))
+        self.api.bulk_send = lambda data, count: None  # пакет не прошел - по одной
+        self.log = []
+        self.fail = set(fail)
+        self._log_lock = threading.Lock()
+
+    def execute(self, command):
+        if command.type == "PRINT":
+            with self._log_lock:
+                self.log.append(command.message)
+            return True
+        return super().execute(command)
+
+    def create(self, command):
+        name = command.name if command.type == "SHAPE" else getattr(command, "text", "")
+        if name in self.fail:
+            raise OSError(f"сбой {name}")
+        if command.type == "LINK":
+            started = (self.api.elements.get(command.start), self.api.elements.get(command.end))
+            name = "link" if all(started) else "link-too-early"
+        time.sleep(random.uniform(0, 0.005))
+        with self._log_lock:
+            self.log.append(name)
+        if command.type == "SHAPE":
+            self.api.elements[command.name] = f"id-{name}"
+        self._created(ITEMS[command.type], command, f"id-{name}")
+        return f"id-{name}"
+
+def stickies(prefix: str, count: int):
+    return [Sticky(f"{prefix}{number}", number * 210, 0, "yellow") for number in range(count)]
+
+class PlanExecutorTest(unittest.TestCase):
+
+    def test_barriers_keep_order(self):
+        executor = RecordingExecutor()
+        plan = stickies("a", 20) + [Print("first")] + stickies("b", 20) + [Print("second")]
+        success = PlanExecutor(executor, workers=8).run(plan)
+
+        log = executor.log
+        self.assertEqual(success, len(plan))
+        self.assertEqual(log[20], "first")
+        self.assertEqual(log[41], "second")
+        self.assertEqual(sorted(log[:20]), sorted(f"a{number}" for number in range(20)))
+        self.assertEqual(sorted(log[21:41]), sorted(f"b{number}" for number in range(20)))
+
+    def test_link_waits_for_its_shapes(self):
+        executor = RecordingExecutor()
+        plan = ([Shape(f"S{number}", number * 200, 0, 100, 100) for number in range(10)] +
+                [Link(f"S{number}", f"S{number + 1}") for number in range(9)])
+        success = PlanExecutor(executor, workers=8).run(plan)
+
+        self.assertEqual(success, len(plan))
+        self.assertEqual(executor.log.count("link"), 9)
+
+    def test_stats_count_created_and_failed_items(self):
+        executor = RecordingExecutor(fail={"a3", "a7"})
+        plan = stickies("a", 10) + [Shape("S", 0, 500, 100, 100)]
+        for batch_size in (1, 4):
+            with self.subTest(batch_size=batch_size):
+                executor.stats = dict.fromkeys(executor.stats, 0)
+                base = executor.api.metrics.totals()
+                success = PlanExecutor(executor, workers=4, batch_size=batch_size).run(plan)
+                totals = executor.api.metrics.totals()
+                self.assertEqual(success, 9)
+                self.assertEqual(executor.stats["stickies"], 8)
+                self.assertEqual(executor.stats["shapes"], 1)
+                self.assertEqual(totals["failure"] - base["failure"], 2)
+
+    def test_raising_step_does_not_hang_the_run(self):
+        executor = RecordingExecutor()
+        executor.execute = lambda command: 1 / 0
+        base = executor.api.metrics.totals()["failure"]
+        success = PlanExecutor(executor, workers=4).run(stickies("a", 5))
+        self.assertEqual(success, 0)
+        self.assertEqual(executor.api.metrics.totals()["failure"] - base, 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Проверка плана: связи вперед и имена на целевых досках публикации
+
+Запуск: python -m unittest discover -s tests
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from _helper import settings
+from _helper.element_registry import ElementRegistry
+from _helper.instruction_parser import InstructionParser
+from _helper.plan_validator import KnownEverywhere, PlanValidator
+
+def plan(*lines: str):
+    parser = InstructionParser()
+    return [parser.parse_line(line, "plan.txt", number)
+            for number, line in enumerate(lines, 1)]
+
+def messages(known, *lines: str):
+    validator = PlanValidator(known=known)
+    validator.check(plan(*lines))
+    return [issue.message for issue in validator.finish()]
+
+class KnownEverywhereTest(unittest.TestCase):
+
+    def test_name_must_exist_on_every_board(self):
+        known = KnownEverywhere([{"Old": "1", "Both": "2"}, {"Both": "3"}])
+        self.assertIn("Both", known)
+        self.assertNotIn("Old", known)
+        self.assertNotIn("Both", KnownEverywhere([]))
+
+    def test_link_to_name_missing_on_one_board(self):
+        known = KnownEverywhere([{"Old": "1"}, {}])
+        self.assertEqual(messages(known, "SHAPE|A|0|0|100|100", "LINK|A|Old"),
+                         ["связь на неизвестную фигуру 'Old'"])
+        known = KnownEverywhere([{"Old": "1"}, {"Old": "2"}])
+        self.assertEqual(messages(known, "SHAPE|A|0|0|100|100", "LINK|A|Old"), [])
+
+    def test_forward_reference_is_an_error_even_if_known(self):
+        known = KnownEverywhere([{"B": "1"}, {"B": "2"}])
+        found = messages(known, "SHAPE|A|0|0|100|100", "LINK|A|B", "SHAPE|B|300|0|100|100")
+        self.assertEqual(len(found), 1)
+        self.assertIn("до ее объявления", found[0])
+
+class FanOutValidationTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state = Path(directory.name)
+        for name, value in (("STATE_DIR", self.state), ("REGISTRY", True),
+                            ("VALIDATE", True), ("JOURNAL", False), ("PARSE_CACHE", False)):
+            patcher = mock.patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        registry = ElementRegistry(self.state / "elements.sqlite", "other")
+        registry["Old"] = "1"
+        registry.close()
+
+        from run import MiroEngine
+        self.engine = MiroEngine("token", "current")
+        self.addCleanup(self.engine.registry.close)
+        self.engine.api.elements["Only here"] = "2"
+        self.file = self.state / "plan.txt"
+
+    def validate(self, text: str, board_ids=None) -> bool:
+        self.file.write_text(text, encoding="utf-8")
+        with redirect_stdout(io.StringIO()):
+            return self.engine.validate([self.file], board_ids)
+
+    def test_current_board_name_does_not_count_for_other_boards(self):
+        text = "SHAPE|A|0|0|100|100\nLINK|A|Only here\n"
+        self.assertTrue(self.validate(text))
+        self.assertFalse(self.validate(text, ["current", "other"]))
+
+    def test_name_known_on_all_target_boards(self):
+        text = "SHAPE|A|0|0|100|100\nLINK|A|Old\n"
+        self.assertTrue(self.validate(text, ["other"]))
+        self.assertFalse(self.validate(text, ["other", "new"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Журнал запуска: одинаковые инструкции из одной строки (REPEAT, INCLUDE)
+
+Запуск: python -m unittest discover -s tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from _helper.instructions import Sticky
+from _helper.run_journal import RunJournal
+
+class RepeatedInstructionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "journal.jsonl"
+        self.api = SimpleNamespace(elements={})
+        self.plan = [Sticky("same", 0, 0, "yellow", "plan.txt", 2) for _ in range(5)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume_recreates_only_missing_copies(self):
+        journal = RunJournal(self.path)
+        for number, instruction in enumerate(self.plan):
+            self.assertFalse(journal.skip(self.api, instruction))
+            if number in (1, 3):
+                journal.mark_failed()
+            else:
+                journal.record(instruction, f"id{number}")
+        journal.complete()
+        journal.close()
+
+        journal = RunJournal(self.path)
+        pending = [instruction for instruction in self.plan
+                   if not journal.skip(self.api, instruction)]
+        journal.close()
+        self.assertEqual(len(pending), 2)
+
+    def test_completed_run_starts_numbering_again(self):
+        journal = RunJournal(self.path)
+        for instruction in self.plan[:2]:
+            journal.record(instruction, "id")
+        journal.complete()
+        journal.mark_failed()
+        journal.record(self.plan[0], "id")
+        journal.complete()
+        self.assertEqual(len(journal.done), 1)
+        journal.close()
+
+if __name__ == "__main__":
+    unittest.main()